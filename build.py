@@ -1,24 +1,39 @@
 #! /usr/bin/env python3
 
+import functools
 import platform
+import shutil
 import subprocess
 import shlex
 import sys
 import os
 from pathlib import Path
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 SRC_ROOT = Path(__file__).resolve().parent
 TARGET_DIR = SRC_ROOT / "target"
 
 
-def sh(*args, append_env={}):
+def sh(*args, env=None, append_env=None):
     print(">", shlex.join(args), file=sys.stderr)
-    ret = subprocess.call(args, env={**os.environ, **append_env})
-    if ret != 0:
+    if env is None:
+        env = os.environ
+    if append_env:
+        env = {**env, **append_env}
+    # An absolute executable path and inherited file descriptors let subprocess use posix_spawn instead of fork/exec
+    process = subprocess.Popen(args, executable=resolve_program(args[0]), env=env, close_fds=False)
+    if process.wait() != 0:
         raise RuntimeError("command failed")
 
 
+@functools.lru_cache(maxsize=None)
+def resolve_program(name):
+    if os.sep in name:
+        return name
+    return shutil.which(name) or name
+
+
 def build(*, target_os=None, target_arch=None, profile="dev", locked=False):
     if target_os is None:
         py_system = platform.system()
@@ -52,7 +67,52 @@ def build(*, target_os=None, target_arch=None, profile="dev", locked=False):
     if locked:
         extra_cargo_build_args += ["--locked"]
 
-    if target_os == "macos":
+    # Snapshot the environment once rather than once per command
+    base_env = dict(os.environ)
+
+    cargo_env = {}
+    if profile != "dev":
+        # Incremental artifacts are only worth their extra I/O for local dev iteration
+        cargo_env["CARGO_INCREMENTAL"] = "0"
+
+    # The guest/interceptor and runtime builds use separate target directories and don't depend on each other, so
+    # we run them concurrently. Only the driver build needs their outputs.
+    def build_support():
+        if target_os == "macos":
+            sh(
+                "cargo",
+                "build",
+                "-Zunstable-options",
+                "--profile",
+                profile,
+                "--target",
+                f"{target_arch}-unknown-none",
+                *extra_cargo_build_args,
+                "-p",
+                "cealn-action-executable-macos-guest",
+                "--bin",
+                "guest",
+                env=base_env,
+                append_env={**cargo_env, "CARGO_TARGET_DIR": str(TARGET_DIR / "guest-target")},
+            )
+        elif target_os == "linux":
+            sh(
+                "cargo",
+                "build",
+                "-Zunstable-options",
+                "--profile",
+                profile,
+                "--target",
+                f"{target_arch}-unknown-linux-gnu",
+                *extra_cargo_build_args,
+                "-p",
+                "cealn-action-executable-linux-interceptor",
+                "--lib",
+                env=base_env,
+                append_env={**cargo_env, "CARGO_TARGET_DIR": str(TARGET_DIR / "interceptor-target")},
+            )
+
+    def build_runtime():
         sh(
             "cargo",
             "build",
@@ -60,45 +120,21 @@ def build(*, target_os=None, target_arch=None, profile="dev", locked=False):
             "--profile",
             profile,
             "--target",
-            f"{target_arch}-unknown-none",
+            "wasm32-wasip1",
             *extra_cargo_build_args,
             "-p",
-            "cealn-action-executable-macos-guest",
+            "cealn-runtime-python",
             "--bin",
-            "guest",
-            append_env={"CARGO_TARGET_DIR": str(TARGET_DIR / "guest-target")},
-        )
-    elif target_os == "linux":
-        sh(
-            "cargo",
-            "build",
-            "-Zunstable-options",
-            "--profile",
-            profile,
-            "--target",
-            f"{target_arch}-unknown-linux-gnu",
-            *extra_cargo_build_args,
-            "-p",
-            "cealn-action-executable-linux-interceptor",
-            "--lib",
-            append_env={"CARGO_TARGET_DIR": str(TARGET_DIR / "interceptor-target")},
+            "runtime-python",
+            env=base_env,
+            append_env={**cargo_env, "CARGO_TARGET_DIR": str(TARGET_DIR / "runtime-target")},
         )
 
-    sh(
-        "cargo",
-        "build",
-        "-Zunstable-options",
-        "--profile",
-        profile,
-        "--target",
-        "wasm32-wasip1",
-        *extra_cargo_build_args,
-        "-p",
-        "cealn-runtime-python",
-        "--bin",
-        "runtime-python",
-        append_env={"CARGO_TARGET_DIR": str(TARGET_DIR / "runtime-target")},
-    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stages = [executor.submit(build_support), executor.submit(build_runtime)]
+        # Propagates any `RuntimeError` from a failed stage
+        for stage in stages:
+            stage.result()
 
     output_target_args = []
     if target_os is not None or target_arch is not None:
@@ -116,7 +152,9 @@ def build(*, target_os=None, target_arch=None, profile="dev", locked=False):
         "cealn-driver",
         "--bin",
         "cealn",
+        env=base_env,
         append_env={
+            **cargo_env,
             "CEALN_RUNTIME_PYTHON_PREBUILT": str(
                 SRC_ROOT
                 / "target"
@@ -4,14 +4,17 @@ import os
 from pathlib import Path, PurePosixPath
 import platform
 import shutil
-import tarfile
+import hashlib
+import functools
+import json
 import subprocess
 import shlex
 import sys
 import re
 import multiprocessing
-import time
+import threading
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import TemporaryFile
 
 if platform.system() == "Windows":
@@ -73,9 +76,51 @@ SOURCE_URL = "https://www.python.org/ftp/python/3.11.3/Python-3.11.3.tar.xz"
 WASI_SYSROOT_URL = "https://github.com/WebAssembly/wasi-sdk/releases/download/wasi-sdk-20/wasi-sysroot-20.0.tar.gz"
 
 
+@functools.lru_cache(maxsize=None)
+def resolve_program(name):
+    # Relative paths (e.g. the configure script) are resolved against the command's cwd, leave them be
+    if os.sep in name:
+        return name
+    return shutil.which(name) or name
+
+
+_LLVM_AR_REGEX = re.compile(r"^llvm-ar-(\d+)$")
+
+
+def find_llvm_ar():
+    """
+    Finds the newest versioned `llvm-ar-N` on the `PATH`, scanning each directory once
+    """
+    best_version = None
+    best_name = None
+    for path_dir in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            entries = os.scandir(path_dir or ".")
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                match = _LLVM_AR_REGEX.match(entry.name)
+                if match is None:
+                    continue
+                version = int(match.group(1))
+                if best_version is not None and version <= best_version:
+                    continue
+                try:
+                    if not entry.is_file() or not os.access(entry.path, os.X_OK):
+                        continue
+                except OSError:
+                    continue
+                best_version = version
+                best_name = entry.name
+    return best_name
+
+
 class Build:
     def __init__(self):
         self.out_dir = Path(os.environ["OUT_DIR"])
+        # Snapshot the environment once rather than once per command
+        self.base_env = dict(os.environ)
 
     @property
     def python_source_path(self) -> Path:
@@ -117,23 +162,27 @@ class Build:
             return "libpython3.11.a"
 
     def run(self):
-        if self.is_wasi:
-            self.download_wasi_sdk()
-        self.download_python()
+        # Both downloads are network bound and write to disjoint directories, so overlap them
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            downloads = [executor.submit(self.download_python)]
+            if self.is_wasi:
+                downloads.append(executor.submit(self.download_wasi_sdk))
+            for download in downloads:
+                download.result()
 
         self.configure()
         self.build()
 
     def build(self):
-        time.sleep(1)
+        # Also picked up by the recursive makes CPython's Makefile issues
+        make_env = {"MAKEFLAGS": f"-j{multiprocessing.cpu_count()}"}
 
         # Regenerate makefile with Setup.local additions
         self.sh(
             "make",
-            "-j",
-            str(multiprocessing.cpu_count()),
             "CROSS_COMPILE=yes",
             "Modules/config.c",
+            append_env=make_env,
             cwd=self.python_build_directory,
         )
 
@@ -147,26 +196,27 @@ class Build:
 
         self.sh(
             "make",
-            "-j",
-            str(multiprocessing.cpu_count()),
             "CROSS_COMPILE=yes",
             "inclinstall",
             "libinstall",
             self.libname,
+            append_env=make_env,
             cwd=self.python_build_directory,
         )
 
-        shutil.copyfile(
-            self.python_build_directory / self.libname,
-            self.python_install_directory / self.libname,
-        )
-
-    def configure(self):
+        # Both live under OUT_DIR, so a hard link almost always works and saves copying the whole archive
+        built_lib = self.python_build_directory / self.libname
+        installed_lib = self.python_install_directory / self.libname
         try:
-            shutil.rmtree(self.python_build_directory)
+            installed_lib.unlink()
         except FileNotFoundError:
             pass
+        try:
+            os.link(built_lib, installed_lib)
+        except OSError:
+            shutil.copyfile(built_lib, installed_lib)
 
+    def configure(self):
         cflags = []
         extra_args = []
         append_env = {}
@@ -199,13 +249,7 @@ class Build:
                     }
                 )
             else:
-                llvm_ar = None
-                for i in range(14, 20):
-                    llvm_ar_candidate = f"llvm-ar-{i}"
-                    if shutil.which(llvm_ar_candidate):
-                        llvm_ar = llvm_ar_candidate
-                        break
-
+                llvm_ar = find_llvm_ar()
                 if llvm_ar is None:
                     raise RuntimeError("failed to find llvm-ar")
 
@@ -227,17 +271,45 @@ class Build:
         if self.debug_build:
             extra_args += ["--with-pydebug"]
 
+        if self.is_wasi:
+            print(f"cargo:rerun-if-changed=Setup.local", flush=True)
+        print("cargo:rerun-if-changed=config.site", flush=True)
+        build_python = shutil.which("python3.11")
+
+        # Configure dominates the build time, so reuse the previous build directory if none of its inputs changed
+        configure_stamp = self.python_build_directory / ".configure.stamp"
+        configure_inputs = {
+            "source_url": SOURCE_URL,
+            "source_stamp": self.python_source_stamp.read_text(encoding="utf-8"),
+            "cflags": cflags,
+            "extra_args": extra_args,
+            "append_env": append_env,
+            "build_python": build_python,
+            "is_wasi": self.is_wasi,
+            "config_site": hashlib.sha256(Path("config.site").read_bytes()).hexdigest(),
+        }
+        if self.is_wasi:
+            configure_inputs["setup_local"] = hashlib.sha256(Path("Setup.local").read_bytes()).hexdigest()
+        configure_digest = hashlib.sha256(json.dumps(configure_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+        try:
+            if configure_stamp.read_text(encoding="utf-8") == configure_digest:
+                return
+        except FileNotFoundError:
+            pass
+
+        try:
+            shutil.rmtree(self.python_build_directory)
+        except FileNotFoundError:
+            pass
+
         self.python_build_directory.mkdir(parents=True)
 
         if self.is_wasi:
             # Configure static modules
-            print(f"cargo:rerun-if-changed=Setup.local", flush=True)
             (self.python_build_directory / "Modules").mkdir(parents=True)
             shutil.copyfile("Setup.local", self.python_build_directory / "Modules" / "Setup.local")
 
-        print("cargo:rerun-if-changed=config.site", flush=True)
         shutil.copyfile("config.site", self.python_build_directory / "config.site")
-        build_python = shutil.which("python3.11")
         self.sh(
             "../python_src/configure",
             f"CFLAGS={shlex.join(cflags)}",
@@ -258,11 +330,20 @@ class Build:
 
         if self.is_wasi:
             # Configure static modules
-            print(f"cargo:rerun-if-changed=Setup.local", flush=True)
             shutil.copyfile("Setup.local", self.python_build_directory / "Modules" / "Setup.local")
+            # Setup.local is copied in after configure generates the Makefile, but the two can land within the same
+            # mtime tick. Backdate the fresh Makefile so make always regenerates it with the Setup.local additions.
+            setup_local_mtime_ns = (self.python_build_directory / "Modules" / "Setup.local").stat().st_mtime_ns
+            makefile_mtime_ns = setup_local_mtime_ns - 1_000_000_000
+            os.utime(self.python_build_directory / "Makefile", ns=(makefile_mtime_ns, makefile_mtime_ns))
+
+        configure_stamp.write_text(configure_digest, encoding="utf-8")
 
     def sh(self, *args, append_env=None, cwd=None):
-        env_base = {**os.environ, **(append_env or {})}
+        if append_env:
+            env_base = {**self.base_env, **append_env}
+        else:
+            env_base = self.base_env
 
         bytes_args = []
         str_args = []
@@ -274,64 +355,130 @@ class Build:
                 bytes_args.append(arg)
         print(shlex.join(str_args), flush=True)
 
-        subprocess.check_call(
+        # An absolute executable path and inherited file descriptors let subprocess use posix_spawn instead of
+        # fork/exec when no cwd is needed
+        process = subprocess.Popen(
             bytes_args,
+            executable=resolve_program(str_args[0]),
             env=env_base,
             cwd=cwd,
+            close_fds=False,
         )
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, str_args)
 
     def download_python(self):
         patches_dir = Path("patches")
         print(f"cargo:rerun-if-changed={patches_dir}", flush=True)
         patch_files = list(sorted(patches_dir.glob("*.patch")))
 
-        print(f"downloading python source from {SOURCE_URL}", flush=True)
-
+        # Skip the download entirely if the extracted and patched source is already present for these inputs
+        digest = hashlib.sha256()
+        digest.update(SOURCE_URL.encode("utf-8"))
+        if self.is_wasi:
+            for input_file in [*patch_files, Path("config.sub"), Path("config.guess")]:
+                print(f"cargo:rerun-if-changed={input_file}", flush=True)
+                digest.update(input_file.read_bytes())
         try:
-            shutil.rmtree(self.python_source_path)
-        except FileNotFoundError:
-            pass
-        try:
-            shutil.rmtree(self.python_build_directory)
+            if self.python_source_stamp.read_text(encoding="utf-8") == digest.hexdigest():
+                return
         except FileNotFoundError:
             pass
 
-        archive_filename = self.out_dir / "python.tar.xz"
-        try:
-            archive_filename.unlink()
-        except FileNotFoundError:
-            pass
-        urllib.request.urlretrieve(SOURCE_URL, archive_filename)
-        with open(archive_filename, "rb") as archive_tempfile:
-            with tarfile.open(fileobj=archive_tempfile, mode="r:xz") as archive:
-                for member in archive:
-                    # Strip containing folder
-                    member.path = str(Path(*Path(member.path).parts[1:]))
-                    archive.extract(member, self.python_source_path)
+        print(f"downloading python source from {SOURCE_URL}", flush=True)
+
+        # Deleting the old trees is slow, so do it while the download is running
+        cleanup_threads = [
+            self.remove_in_background(self.python_source_path),
+            self.remove_in_background(self.python_build_directory),
+        ]
+
+        # Stream straight into tar so download, decompression, and extraction overlap
+        self.python_source_path.mkdir(parents=True)
+        tar_process = subprocess.Popen(
+            ["tar", "-xJf", "-", "--strip-components=1", "-C", str(self.python_source_path)],
+            stdin=subprocess.PIPE,
+        )
+        with urllib.request.urlopen(SOURCE_URL) as response:
+            shutil.copyfileobj(response, tar_process.stdin, length=1 << 20)
+        tar_process.stdin.close()
+        if tar_process.wait() != 0:
+            raise RuntimeError("tar command failed")
 
         if self.is_wasi:
+            # patch accepts a stream of concatenated patches, so apply them all with a single process
+            patch_process = subprocess.Popen(
+                ["patch", "-p1", "--batch"], cwd=self.python_source_path, stdin=subprocess.PIPE
+            )
             for patch_file in patch_files:
-                print(f"cargo:rerun-if-changed={patch_file}", flush=True)
-                with open(patch_file, "rb") as f:
-                    patch_process = subprocess.Popen(
-                        ["patch", "-p1"], cwd=self.python_source_path, stdin=subprocess.PIPE
-                    )
-                    patch_process.communicate(input=f.read())
-                    if patch_process.wait() != 0:
-                        raise RuntimeError("patch command failed")
+                patch_data = patch_file.read_bytes()
+                patch_process.stdin.write(patch_data)
+                if not patch_data.endswith(b"\n"):
+                    patch_process.stdin.write(b"\n")
+            patch_process.stdin.close()
+            if patch_process.wait() != 0:
+                raise RuntimeError("patch command failed")
 
             for file_name in ["config.sub", "config.guess"]:
                 shutil.copyfile(file_name, self.python_source_path / file_name)
 
+        # Only written once everything above succeeded, so a partial download is never reused
+        self.python_source_stamp.write_text(digest.hexdigest(), encoding="utf-8")
+
+        for thread in cleanup_threads:
+            if thread is not None:
+                thread.join()
+
+    def remove_in_background(self, path: Path):
+        """
+        Moves `path` aside and deletes it on a background thread, returning the thread if there was anything to delete
+        """
+        trash_path = path.with_name(path.name + ".old")
+        # Left behind by an interrupted build
+        try:
+            shutil.rmtree(trash_path)
+        except FileNotFoundError:
+            pass
+        try:
+            path.rename(trash_path)
+        except FileNotFoundError:
+            return None
+        thread = threading.Thread(target=shutil.rmtree, args=(trash_path,))
+        thread.start()
+        return thread
+
     def download_wasi_sdk(self):
         # FIXME: detect changes in URL
         if not self.wasi_sysroot_path.exists():
-            with urllib.request.urlopen(WASI_SYSROOT_URL) as response:
-                with tarfile.open(fileobj=response, mode="r|gz") as archive:
-                    for member in archive:
-                        # Strip containing folder
-                        member.path = str(Path(*Path(member.path).parts[1:]))
-                        archive.extract(member, self.wasi_sysroot_path)
+            # Use pigz when available to spread decompression across cores
+            if shutil.which("pigz"):
+                decompress_args = ["--use-compress-program=pigz"]
+            else:
+                decompress_args = ["-z"]
+            # Extract next to the sysroot and only move it into place once complete, otherwise the exists() check above
+            # would treat an interrupted download as a finished sysroot
+            staging_path = self.wasi_sysroot_path.with_name(self.wasi_sysroot_path.name + ".partial")
+            try:
+                shutil.rmtree(staging_path)
+            except FileNotFoundError:
+                pass
+            staging_path.mkdir(parents=True)
+            tar_process = subprocess.Popen(
+                ["tar", "-x", *decompress_args, "-f", "-", "--strip-components=1", "-C", str(staging_path)],
+                stdin=subprocess.PIPE,
+            )
+            try:
+                with urllib.request.urlopen(WASI_SYSROOT_URL) as response:
+                    shutil.copyfileobj(response, tar_process.stdin, length=1 << 20)
+                tar_process.stdin.close()
+                if tar_process.wait() != 0:
+                    raise RuntimeError("tar command failed")
+            except BaseException:
+                tar_process.kill()
+                tar_process.wait()
+                shutil.rmtree(staging_path, ignore_errors=True)
+                raise
+            staging_path.rename(self.wasi_sysroot_path)
 
 
 if __name__ == "__main__":
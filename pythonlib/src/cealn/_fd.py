@@ -0,0 +1,40 @@
+import locale
+import os
+from typing import Optional
+
+_MAX_BUFFER_SIZE = 128 * 1024
+
+
+def open_fd(fd: int, encoding: Optional[str]):
+    """
+    Opens a file descriptor handed to us by the runtime for reading as text
+    """
+    # Most files we're handed are small, so don't allocate the full read buffer unless the content needs it
+    size = os.fstat(fd).st_size
+    buffering = min(max(size, 4096), _MAX_BUFFER_SIZE) if size > 0 else _MAX_BUFFER_SIZE
+    return open(fd, "r", encoding=encoding, buffering=buffering)
+
+
+def read_all_fd(fd: int, encoding: Optional[str]) -> str:
+    """
+    Reads the remainder of a file descriptor in one go and closes it
+
+    Equivalent to `open(fd, "r", encoding=encoding).read()`, but skips setting up buffered and text IO layers for
+    what is a single bulk read.
+    """
+    try:
+        chunks = []
+        remaining = os.fstat(fd).st_size
+        while True:
+            chunk = os.read(fd, max(remaining, 64 * 1024))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+    finally:
+        os.close(fd)
+    text = b"".join(chunks).decode(encoding or locale.getpreferredencoding(False))
+    # Match the universal newline translation of text mode files
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
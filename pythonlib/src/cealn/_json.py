@@ -1,7 +1,9 @@
 import inspect
 import json
+import operator
+import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict
 import site
 
 from .label import Label, LabelPath
@@ -10,107 +12,157 @@ LABEL_SENTINEL = "$cealn_label"
 LABEL_PATH_SENTINEL = "$cealn_label_path"
 RULE_SENTINEL = "$cealn_target"
 
+_WORKSPACES_PREFIX = "/workspaces/"
+_BUILTIN_CEALN_PREFIX = os.path.join(site.getsitepackages()[0], "cealn", "")
+
 
 def encode_json(obj) -> str:
-    return json.dumps(
-        obj,
-        sort_keys=True,
-        # No extra spaces around separators
-        separators=(",", ":"),
-        cls=_CealnJSONEncoder,
-    )
+    return _ENCODER.encode(obj)
 
 
 def decode_json(data: str) -> Any:
     return json.loads(data, object_hook=_decode_json_object)
 
 
-class _CealnJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        from .action import Action, TemplateArgument, RespfileArgument, StructuredMessageConfig
-        from .provider import Provider
-        from .glob import GlobSet
-        from .config import Option, Selection
-
-        if isinstance(obj, Label):
-            return {LABEL_SENTINEL: str(obj)}
-        elif isinstance(obj, LabelPath):
-            return {LABEL_PATH_SENTINEL: str(obj)}
-        elif isinstance(obj, Action):
-            return self.default(obj.to_json())
-        elif isinstance(obj, Provider):
-            return self.default(obj.to_json())
-        elif isinstance(obj, GlobSet):
-            return obj.to_json()
-        elif isinstance(obj, type) and issubclass(obj, Option):
-            return obj.to_json()
-        elif isinstance(obj, Selection):
-            return obj.to_json()
-        elif isinstance(obj, TemplateArgument):
-            return self.default(obj.to_json())
-        elif isinstance(obj, RespfileArgument):
-            return self.default(obj.to_json())
-        elif isinstance(obj, StructuredMessageConfig):
-            return self.default(obj.to_json())
-        elif isinstance(obj, dict):
-            newobj = {}
-            for k, v in obj.items():
-                newobj[k] = self.default(v)
-            return newobj
-        elif isinstance(obj, (list, tuple)):
-            return [self.default(item) for item in obj]
-        elif isinstance(obj, (str, bool, int, float, type(None))):
-            return obj
-        else:
-            json.JSONEncoder.default(self, obj)
+def _cealn_default(obj):
+    handler = _encode_handler(type(obj))
+    if handler is None:
+        raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+    # Handlers only convert the object itself, the encoder takes care of walking any containers they return
+    return handler(obj)
+
+
+_ENCODE_HANDLERS = None
+
+
+def _encode_handler(ty):
+    global _ENCODE_HANDLERS
+
+    if _ENCODE_HANDLERS is None:
+        _ENCODE_HANDLERS = _build_encode_handlers()
+
+    try:
+        return _ENCODE_HANDLERS[ty]
+    except KeyError:
+        pass
+
+    # Concrete subclasses (e.g. of `Action` and `Provider`) are resolved through their MRO once and then cached
+    handler = None
+    for base in ty.__mro__:
+        handler = _ENCODE_HANDLERS.get(base)
+        if handler is not None:
+            break
+    _ENCODE_HANDLERS[ty] = handler
+    return handler
+
+
+def _build_encode_handlers():
+    from .action import Action, TemplateArgument, RespfileArgument, StructuredMessageConfig
+    from .provider import Provider
+    from .glob import GlobSet
+    from .config import OptionMeta, Selection
+    from .rule import RuleInvocation, _LazyJoin
+
+    to_json = operator.methodcaller("to_json")
+
+    return {
+        Label: lambda obj: {LABEL_SENTINEL: str(obj)},
+        LabelPath: lambda obj: {LABEL_PATH_SENTINEL: str(obj)},
+        Action: to_json,
+        Provider: to_json,
+        GlobSet: to_json,
+        # Options are serialized as the classes themselves
+        OptionMeta: to_json,
+        Selection: to_json,
+        TemplateArgument: to_json,
+        RespfileArgument: to_json,
+        StructuredMessageConfig: to_json,
+        RuleInvocation: to_json,
+        _LazyJoin: str,
+    }
+
+
+# Shared so each call doesn't construct a new encoder. A plain `default` hook (rather than a `JSONEncoder` subclass)
+# keeps the encoder on its C implementation.
+_ENCODER = json.JSONEncoder(
+    sort_keys=True,
+    # No extra spaces around separators
+    separators=(",", ":"),
+    default=_cealn_default,
+)
 
 
 def _decode_json_object(obj):
+    global _DECODE_HANDLERS
+
+    if _DECODE_HANDLERS is None:
+        _DECODE_HANDLERS = _build_decode_handlers()
+
+    # Sentinel keys never share an object with each other, so the first one found decides the type
+    for k in obj:
+        handler = _DECODE_HANDLERS.get(k)
+        if handler is not None:
+            return handler(obj)
+    return obj
+
+
+_DECODE_HANDLERS = None
+
+
+def _build_decode_handlers():
     from .action import _JSON_ACTION_SENTINEL, Action
     from .provider import _JSON_PROVIDER_SENTINEL, Provider
     from .glob import _JSON_GLOBSET_SENTINEL, GlobSet
     from .config import _JSON_OPTION_SENTINEL, _JSON_SELECTION_SENTINEL, Option, Selection
 
-    if LABEL_SENTINEL in obj:
-        return Label(obj[LABEL_SENTINEL])
-    elif LABEL_PATH_SENTINEL in obj:
-        return LabelPath(obj[LABEL_PATH_SENTINEL])
-    elif _JSON_ACTION_SENTINEL in obj:
-        return Action.from_json(obj)
-    elif _JSON_PROVIDER_SENTINEL in obj:
-        return Provider.from_json(obj)
-    elif _JSON_GLOBSET_SENTINEL in obj:
-        return GlobSet.from_json(obj)
-    elif _JSON_OPTION_SENTINEL in obj:
-        return Option.from_json(obj)
-    elif _JSON_SELECTION_SENTINEL in obj:
-        return Selection.from_json(obj)
-    else:
-        return obj
+    return {
+        LABEL_SENTINEL: lambda obj: Label(obj[LABEL_SENTINEL]),
+        LABEL_PATH_SENTINEL: lambda obj: LabelPath(obj[LABEL_PATH_SENTINEL]),
+        _JSON_ACTION_SENTINEL: Action.from_json,
+        _JSON_PROVIDER_SENTINEL: Provider.from_json,
+        _JSON_GLOBSET_SENTINEL: GlobSet.from_json,
+        _JSON_OPTION_SENTINEL: Option.from_json,
+        _JSON_SELECTION_SENTINEL: Selection.from_json,
+    }
 
 
 def _reference_label(obj):
-    file = Path(inspect.getabsfile(obj))
+    file = inspect.getabsfile(obj)
     # FIXME: with probably breaks on a bunch of stuff
-    try:
-        workspaces_dir_relative = file.relative_to("/workspaces")
-    except ValueError:
-        try:
-            builtin_dir_relative = file.relative_to(Path(site.getsitepackages()[0]) / "cealn")
-            return Label(f"@com.cealn.builtin//:{builtin_dir_relative}")
-        except ValueError:
-            raise RuntimeError(f"rule defined outside of workspace: {file!r}")
-    workspace_name = workspaces_dir_relative.parts[0]
-    workspace_path = workspaces_dir_relative.relative_to(workspace_name)
+    if not file.startswith(_WORKSPACES_PREFIX):
+        if file.startswith(_BUILTIN_CEALN_PREFIX):
+            return Label(f"@com.cealn.builtin//:{file[len(_BUILTIN_CEALN_PREFIX):]}")
+        raise RuntimeError(f"rule defined outside of workspace: {file!r}")
+    workspace_name, _, workspace_path = file[len(_WORKSPACES_PREFIX) :].partition("/")
+    workspace_root = _WORKSPACES_PREFIX + workspace_name
     # Find containing package
-    package_subpath = Path(".")
-    for subpath in list(file.parents)[:-1]:
-        if (subpath / "build.cealn").exists():
-            package_subpath = subpath.relative_to(Path("/workspaces") / workspace_name)
+    package_dir = _find_package_dir(os.path.dirname(file), workspace_root)
+    package_subpath = package_dir[len(workspace_root) + 1 :]
+    if package_subpath:
+        package_relative_path = workspace_path[len(package_subpath) + 1 :]
+    else:
+        package_relative_path = workspace_path
+    return Label(f"@{workspace_name}//") / f"{package_subpath}:{package_relative_path}"
+
+
+# Maps directories to the directory of their containing package, shared by all references from the same package
+_PACKAGE_DIR_CACHE: Dict[str, str] = {}
+
+
+def _find_package_dir(directory: str, workspace_root: str) -> str:
+    visited = []
+    while True:
+        package_dir = _PACKAGE_DIR_CACHE.get(directory)
+        if package_dir is not None:
+            break
+        visited.append(directory)
+        if os.path.exists(directory + "/build.cealn") or directory == workspace_root:
+            package_dir = directory
             break
-    if str(package_subpath) == ".":
-        package_subpath = ""
-    return Label(f"@{workspace_name}//") / f"{package_subpath}:{workspace_path.relative_to(package_subpath)}"
+        directory = directory[: directory.rfind("/")]
+    for visited_directory in visited:
+        _PACKAGE_DIR_CACHE[visited_directory] = package_dir
+    return package_dir
 
 
 def _reference_object(obj):
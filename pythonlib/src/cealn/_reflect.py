@@ -1,9 +1,34 @@
-import sys
+import functools
+import importlib.util
 import inspect
+import sys
 
 
 def get_caller_location() -> inspect.Traceback:
     # We want the frame for the caller of the caller of THIS function
-    # The second parameter indicates we don't care abouut the context (this greatly speeds up fetching the frame)
-    frame = inspect.getframeinfo(sys._getframe(2), 0)
-    return frame
+    # Read the code object directly rather than using `inspect.getframeinfo`, since we don't need any source context
+    frame = sys._getframe(2)
+    code = frame.f_code
+    return inspect.Traceback(code.co_filename, frame.f_lineno, code.co_name, None, None)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_qualname(source_label, qualname: str):
+    """
+    Resolves an object reference (as produced by `_json._reference_object`), importing its module if needed
+    """
+    # Load containing module
+    import_filename = source_label.to_source_file_path()
+    module_name = source_label.to_python_module_name()
+    if module_name in sys.modules:
+        module = sys.modules[module_name]
+    else:
+        spec = importlib.util.spec_from_file_location(module_name, import_filename)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+    if "." in qualname:
+        # FIXME
+        raise RuntimeError("not implemented")
+    return getattr(module, qualname)
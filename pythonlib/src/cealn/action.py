@@ -1,10 +1,11 @@
 import json
-import re
 import os
+import sys
 from typing import Optional, List, Dict, Tuple
 from collections.abc import Iterable
 import urllib.parse
 import hashlib
+from ._fd import open_fd
 from ._json import encode_json
 
 from cealn.label import Label
@@ -15,8 +16,6 @@ from .config import Option
 
 _JSON_ACTION_SENTINEL = "$cealn_action"
 
-_CAMEL_TO_SNAKE_REGEX = re.compile(r"(?<!^)(?=[A-Z])")
-
 _ACTION_DISCRIM_MAP = {}
 
 
@@ -24,11 +23,24 @@ class ActionMeta(type):
     def __init__(cls, name, bases, dct):
         super().__init__(name, bases, dct)
 
-        # Default discriminator based on class name
-        cls._json_discrim = _CAMEL_TO_SNAKE_REGEX.sub("_", name).lower()
+        # Default discriminator based on class name. Interned since it is emitted for every serialized action and used
+        # as the registry key.
+        cls._json_discrim = sys.intern(_camel_to_snake(name))
 
         _ACTION_DISCRIM_MAP[cls._json_discrim] = cls
 
+        # Cached so construction and serialization don't need to walk `__annotations__` each time
+        cls._ordered_annotations = tuple(cls.__annotations__)
+
+
+def _camel_to_snake(name: str) -> str:
+    out = []
+    for i, c in enumerate(name):
+        if i and "A" <= c <= "Z":
+            out.append("_")
+        out.append(c)
+    return "".join(out).lower()
+
 
 class Action(metaclass=ActionMeta):
     def __init__(self, *, id: Optional[str], mnemonic: str, progress_message: str, **kwargs):
@@ -38,15 +50,15 @@ class Action(metaclass=ActionMeta):
 
         self._files = None
 
-        for var_name in self.__class__.__annotations__:
+        for var_name in self.__class__._ordered_annotations:
             setattr(self, var_name, kwargs[var_name])
 
     @property
     def id(self):
         if self._id is None:
-            # We need to set this to handle recursive call in `_common_json`
-            self._id = ""
-            self._id = hashlib.sha256(encode_json(self.to_json()).encode("utf-8")).hexdigest()
+            # The ID is the hash of the serialized action with an empty ID. Building that payload directly (instead of
+            # going through `to_json`) means `_id` is only ever assigned the finished hash.
+            self._id = hashlib.sha256(encode_json(self._json_data("")).encode("utf-8")).hexdigest()
         return self._id
 
     @property
@@ -59,21 +71,26 @@ class Action(metaclass=ActionMeta):
         pass
 
     def to_json(self):
+        return self._json_data(self.id)
+
+    def _json_data(self, id: str):
         data = {
             _JSON_ACTION_SENTINEL: self.__class__._json_discrim,
-            "id": self.id,
+            "id": id,
             "mnemonic": self.mnemonic,
             "progress_message": self.progress_message,
         }
-        for var_name in self.__class__.__annotations__:
-            data[var_name] = getattr(self, var_name)
+        data.update(self._json_fields())
         return data
 
+    def _json_fields(self):
+        return {var_name: getattr(self, var_name) for var_name in self.__class__._ordered_annotations}
+
     def __await__(self):
         yield from self.prepare(self.rule).__await__()
         for action in self.rule.actions:
             yield from action.prepare(self.rule).__await__()
-        response = yield [dict(type="action_output", action=self, partial_actions=self.rule.actions)]
+        response = yield dict(type="action_output", action=self, partial_actions=self.rule.actions)
         return ActionOutput.from_json(response)
 
     @classmethod
@@ -97,7 +114,7 @@ class ActionOutput:
         from .rule import AsyncRequestAwaiter
 
         result = await AsyncRequestAwaiter(dict(type="content_ref_open", hash=self._stdout_content_ref))
-        return open(result["fileno"], "r", encoding=encoding, buffering=128 * 1024)
+        return open_fd(result["fileno"], encoding)
 
     @classmethod
     def from_json(cls, data):
@@ -170,18 +187,13 @@ class Transition(Action):
     label: Label
     changed_options: List[Tuple[Option, Option]]
 
-    def to_json(self):
+    def _json_fields(self):
         from ._json import _reference_object
 
-        data = {
-            _JSON_ACTION_SENTINEL: self.__class__._json_discrim,
-            "id": self.id,
-            "mnemonic": self.mnemonic,
-            "progress_message": self.progress_message,
+        return {
             "label": self.label,
             "changed_options": [(_reference_object(a), _reference_object(b)) for a, b in self.changed_options],
         }
-        return data
 
 
 class TemplateArgument:
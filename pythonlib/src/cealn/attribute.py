@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Dict, Generic, List, Optional, Type, TypeVar, Union, get_type_hints
+from typing import TYPE_CHECKING, Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 import types
+from cealn.config import Selection
 from cealn.glob import GlobSet
 
 from cealn.label import Label
@@ -14,6 +15,8 @@ T = TypeVar("T")
 
 
 class Attribute(Generic[T]):
+    __slots__ = ("name", "_attr", "has_default", "default")
+
     name: str
     has_default: bool
     default: Optional[T]
@@ -22,6 +25,7 @@ class Attribute(Generic[T]):
 
     def __init__(self, **kwargs):
         self.name = None
+        self._attr = None
         if "default" in kwargs:
             self.has_default = True
             self.default = kwargs.pop("default")
@@ -32,6 +36,11 @@ class Attribute(Generic[T]):
         if kwargs:
             raise TypeError(f"unexpected arguments {', '.join(kwargs.keys())}")
 
+    def __set_name__(self, owner, name):
+        self.name = name
+        # Resolved values are stored directly on the rule instance under this name
+        self._attr = f"_resolved_{name}"
+
     def coerce_source(self, source, *, package=None):
         """
         Validates the value for the attribute passed in at load time and performs any necessary conversion
@@ -51,18 +60,16 @@ class Attribute(Generic[T]):
         return value
 
     async def resolve_from_source(self, source: Union[T, Attribute.NotSet], *, rule: Rule):
-        from .config import Selection
-
         if Attribute.is_unresolved_value(source):
             if isinstance(source, Selection):
                 source = await source.resolve(rule)
             elif isinstance(source, dict):
-                new_value = {}
-                for k, v in source.items():
-                    k = await self.resolve_from_source(k, rule=rule)
-                    v = await self.resolve_from_source(v, rule=rule)
-                    new_value[k] = v
-                source = new_value
+                # Resolve all keys and values together so any requests they make are issued concurrently
+                resolved = await rule.gather(
+                    [self.resolve_from_source(k, rule=rule) for k in source.keys()]
+                    + [self.resolve_from_source(v, rule=rule) for v in source.values()]
+                )
+                source = dict(zip(resolved[: len(source)], resolved[len(source) :]))
             else:
                 raise RuntimeError("unknown unresolved value type")
 
@@ -78,29 +85,35 @@ class Attribute(Generic[T]):
         return self.coerce_value(value)
 
     def __get__(self, obj, objtype=None):
-        return obj.attributes_resolved[self.name]
+        if obj is None:
+            return self
+        return getattr(obj, self._attr)
 
     @property
     def is_optional(self) -> bool:
         return self.has_default
 
     @classmethod
-    def is_unresolved_value(self, value):
-        from .config import Selection
-
+    def is_unresolved_value(cls, value):
         # FIXME: once we add generated values, check those here
-        if isinstance(value, Selection):
-            return True
-        elif isinstance(value, dict):
-            for k, v in value.items():
-                if self.is_unresolved_value(k):
-                    return True
-                if self.is_unresolved_value(v):
-                    return True
+        stack = [value]
+        while stack:
+            v = stack.pop()
+            t = type(v)
+            if t is dict:
+                stack.extend(v.keys())
+                stack.extend(v.values())
+            elif t is Selection or isinstance(v, Selection):
+                return True
+            elif isinstance(v, dict):
+                stack.extend(v.keys())
+                stack.extend(v.values())
         return False
 
 
 class LabelAttribute(Attribute[Label]):
+    __slots__ = ()
+
     def coerce_source(self, source, *, package=None):
         if Attribute.is_unresolved_value(source):
             return source
@@ -110,9 +123,9 @@ class LabelAttribute(Attribute[Label]):
         # at the time of the call. Resolving labels relative to the rule package when they are
         # generated values is likely to be confusing.
         if package:
-            if label.is_package_relative and ":" not in str(label):
+            if label._is_package_relative and ":" not in label._repr:
                 # Since this is explicitly a file attribute, we default paths to point to files within the current package if not specified
-                label = Label(":" + str(label))
+                label = Label(":" + label._repr)
             return package / label
         else:
             return label
@@ -121,16 +134,18 @@ class LabelAttribute(Attribute[Label]):
         if isinstance(source, Label):
             return source
         elif isinstance(source, str):
-            return Label(source)
+            return Label._intern(source)
         else:
             raise TypeError("expected label")
 
 
 class FileAttribute(LabelAttribute):
-    pass
+    __slots__ = ()
 
 
 class LabelListAttribute(Attribute[List[Label]]):
+    __slots__ = ()
+
     def coerce_source(self, source, *, package=None):
         if Attribute.is_unresolved_value(source):
             return source
@@ -142,9 +157,9 @@ class LabelListAttribute(Attribute[List[Label]]):
             # at the time of the call. Resolving labels relative to the rule package when they are
             # generated values is likely to be confusing.
             if package:
-                if label.is_package_relative and ":" not in str(label):
+                if label._is_package_relative and ":" not in label._repr:
                     # Since this is explicitly a file attribute, we default paths to point to files within the current package if not specified
-                    label = Label(":" + str(label))
+                    label = Label(":" + label._repr)
                 label = package / label
             coerced.append(label)
 
@@ -154,22 +169,25 @@ class LabelListAttribute(Attribute[List[Label]]):
         if isinstance(source, Label):
             return source
         elif isinstance(source, str):
-            return Label(source)
+            return Label._intern(source)
         else:
             raise TypeError("expected label")
 
 
 class LabelMapAttribute(Attribute[Dict[str, Label]]):
+    __slots__ = ()
+
     def coerce_source(self, source, *, package=None):
         if Attribute.is_unresolved_value(source):
             return source
 
+        coerce_label = self._coerce_label
         coerced = {}
         for k, v in source.items():
             if isinstance(v, list):
-                coerced[k] = [self._coerce_label(item, package) for item in v]
+                coerced[k] = [coerce_label(item, package) for item in v]
             else:
-                coerced[k] = self._coerce_label(v, package)
+                coerced[k] = coerce_label(v, package)
 
         return coerced
 
@@ -177,13 +195,13 @@ class LabelMapAttribute(Attribute[Dict[str, Label]]):
         if isinstance(source, Label):
             label = source
         elif isinstance(source, str):
-            label = Label(source)
+            label = Label._intern(source)
         else:
             raise TypeError(f"expected label, but got {source!r}")
         if package:
-            if label.is_package_relative and ":" not in str(label):
+            if label._is_package_relative and ":" not in label._repr:
                 # Since this is explicitly a file attribute, we default paths to point to files within the current package if not specified
-                label = Label(":" + str(label))
+                label = Label(":" + label._repr)
             label = package / label
         # Note that we only resolve labels relative to the package when they are resolved
         # at the time of the call. Resolving labels relative to the rule package when they are
@@ -192,6 +210,8 @@ class LabelMapAttribute(Attribute[Dict[str, Label]]):
 
 
 class ProviderAttribute(LabelAttribute):
+    __slots__ = ("provider_type", "host")
+
     def __init__(self, provider_type, *, host=False, **kwargs):
         super().__init__(**kwargs)
 
@@ -217,6 +237,8 @@ class GlobalProviderAttribute(Attribute[Label]):
     A provider which defaults to a globally registered default
     """
 
+    __slots__ = ("provider_type", "host")
+
     def __init__(self, provider_type: Type[Provider], *, host=False, **kwargs):
         super().__init__(**kwargs)
         self.provider_type = provider_type
@@ -234,6 +256,8 @@ class GlobalProviderAttribute(Attribute[Label]):
 
 
 class GlobSetAttribute(Attribute[GlobSet]):
+    __slots__ = ()
+
     def coerce_value(self, value):
         if isinstance(value, GlobSet):
             return value
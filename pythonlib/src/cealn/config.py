@@ -1,4 +1,5 @@
 from ._json import _reference_object
+from ._reflect import _load_qualname
 
 
 class OptionMeta(type):
@@ -15,28 +16,14 @@ class Option(metaclass=OptionMeta):
 
     @classmethod
     def from_json(cls, data):
-        import importlib.util
-        import sys
-
-        contents = data[_JSON_OPTION_SENTINEL]
-
-        # Load containing module
-        import_filename = contents["source_label"].to_source_file_path()
-        module_name = contents["source_label"].to_python_module_name()
-        if module_name in sys.modules:
-            module = sys.modules[module_name]
-        else:
-            spec = importlib.util.spec_from_file_location(module_name, import_filename)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-
-        qualname = contents["qualname"]
-        if "." in qualname:
-            # FIXME
-            raise RuntimeError("not implemented")
-        clazz = getattr(module, qualname)
-        return clazz
+        return cls._from_raw(data[_JSON_OPTION_SENTINEL])
+
+    @classmethod
+    def _from_raw(cls, contents):
+        """
+        Like `from_json`, but takes the object reference without the sentinel wrapper
+        """
+        return _load_qualname(contents["source_label"], contents["qualname"])
 
 
 _JSON_OPTION_SENTINEL = "$cealn_option"
@@ -46,13 +33,26 @@ class Selection:
     def __init__(self, mapping, default):
         self.mapping = mapping
         self.default = default
+        # Group branches by the option they select on, so resolving is a lookup per option rather than a scan. Each
+        # branch keeps its position in `mapping` so the earliest matching branch still wins when options are mixed.
+        self._by_base = {}
+        for index, (k, v) in enumerate(mapping.items()):
+            # FIXME: handle more levels of inheritance
+            self._by_base.setdefault(k.__bases__[0], {})[k] = (index, v)
 
     async def resolve(self, rule):
-        for k, v in self.mapping.items():
-            # FIXME: handle more levels of inheritance
-            if rule.build_config[k.__bases__[0]] == k:
-                return v
-        return self.default
+        best = None
+        # Groups are ordered by their first branch, so once a match precedes the next group's first branch no later
+        # group can win. Stopping there also means options that only later branches select on need not be configured.
+        for base, branches in self._by_base.items():
+            if best is not None and best[0] < next(iter(branches.values()))[0]:
+                break
+            match = branches.get(rule.build_config[base])
+            if match is not None and (best is None or match[0] < best[0]):
+                best = match
+        if best is None:
+            return self.default
+        return best[1]
 
     def to_json(self):
         return {
@@ -64,9 +64,6 @@ class Selection:
 
     @classmethod
     def from_json(cls, data):
-        import importlib.util
-        import sys
-
         contents = data[_JSON_SELECTION_SENTINEL]
 
         return Selection(dict(contents["mapping"]), contents["default"])
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import functools
 import os
-from typing import Optional, Union, List
+from typing import Iterable, NamedTuple, Optional, Tuple, Union, List
 import fnmatch
 import re
 
 from cealn.label import Label, LabelPath
+from cealn._fd import open_fd, read_all_fd
 
 
 class DepmapBuilder:
+    # Rules create many short-lived builders, so keep them (and their entry values) free of instance dicts
+    __slots__ = ("rule", "id", "_keys", "_payloads")
+
     def __init__(self, rule, id: Optional[str]):
         self.rule = rule
         self.id = id
 
-        self._entries = []
+        # Entries are stored column-wise and only turned into their serialized form when the depmap is built
+        self._keys: List[LabelPath] = []
+        self._payloads: List[_EntryPayload] = []
 
     def __setitem__(
         self, k: Union[LabelPath, str], value: Union[str, Label, DepmapBuilder.Directory, DepmapBuilder.FileLiteral]
@@ -25,47 +32,38 @@ class DepmapBuilder:
         k = k.normalize_require_descending()
 
         if isinstance(value, str):
-            value = Label(value)
-        if isinstance(value, Label):
-            value = dict(reference=value)
-        elif isinstance(value, DepmapBuilder.Directory):
-            value = dict(directory={})
-        elif isinstance(value, DepmapBuilder.FileLiteral):
-            value = dict(file=dict(content=value.content, executable=value.executable))
-        elif isinstance(value, DepmapBuilder.Symlink):
-            value = dict(symlink=dict(target=value.target))
-        elif isinstance(value, DepmapBuilder.Glob):
-            value = dict(
-                filter=dict(
-                    base=value.base,
-                    prefix=LabelPath(""),
-                    patterns=[_translate_glob(pattern) for pattern in value.patterns],
-                )
-            )
-        else:
-            raise TypeError("invalid entry value for depmap builder")
-        self._entries.append((k, value))
+            value = Label._intern(value)
+        self._append(k, value)
+
+    def update(self, entries: Iterable[Tuple[Union[LabelPath, str], object]]):
+        """
+        Adds several entries at once, equivalent to assigning each `(key, value)` pair in order
+        """
+        setitem = self.__setitem__
+        for k, value in entries:
+            setitem(k, value)
 
     def merge(self, value: Label):
+        self._append(LabelPath(""), value)
+
+    def _append(self, k: LabelPath, value):
         if isinstance(value, Label):
-            value = dict(reference=value)
+            payload = _Reference(value)
         elif isinstance(value, DepmapBuilder.Directory):
-            value = dict(directory={})
+            payload = _DIRECTORY
         elif isinstance(value, DepmapBuilder.FileLiteral):
-            value = dict(file=dict(content=value.content, executable=value.executable))
+            payload = _File(value.content, value.executable)
         elif isinstance(value, DepmapBuilder.Symlink):
-            value = dict(symlink=dict(target=value.target))
+            payload = _Symlink(value.target)
         elif isinstance(value, DepmapBuilder.Glob):
-            value = dict(
-                filter=dict(
-                    base=value.base,
-                    prefix=LabelPath(""),
-                    patterns=[_translate_glob(pattern) for pattern in value.patterns],
-                )
-            )
+            payload = _Filter(value.base, [_translate_glob(pattern) for pattern in value.patterns])
         else:
             raise TypeError("invalid entry value for depmap builder")
-        self._entries.append((LabelPath(""), value))
+        self._keys.append(k)
+        self._payloads.append(payload)
+
+    def _entries(self) -> List[Tuple[LabelPath, dict]]:
+        return [(k, _MATERIALIZERS[type(payload)](payload)) for k, payload in zip(self._keys, self._payloads)]
 
     def build(self) -> Label:
         return self.rule._build_depmap(self).files
@@ -85,24 +83,30 @@ class DepmapBuilder:
     @classmethod
     def glob(cls, base: Label, *patterns) -> Glob:
         if isinstance(base, str):
-            base = Label(base)
+            base = Label._intern(base)
         if not isinstance(base, Label):
             raise TypeError("base must be a label")
         return cls.Glob(base, list(patterns))
 
     class Directory:
-        pass
+        __slots__ = ()
 
     class FileLiteral:
+        __slots__ = ("content", "executable")
+
         def __init__(self, content: Union[str, bytes], *, executable: bool):
             self.content = content
             self.executable = executable
 
     class Symlink:
+        __slots__ = ("target",)
+
         def __init__(self, target: str):
             self.target = target
 
     class Glob:
+        __slots__ = ("base", "patterns")
+
         def __init__(self, base: Label, patterns: List[str]):
             self.base = base
             self.patterns = patterns
@@ -115,10 +119,12 @@ class ConcreteDepmap:
     async def get_file_contents(self, filename: str, *, encoding: Optional[str] = None):
         if not isinstance(filename, str):
             raise TypeError("filename must be a string")
-        with await self.open_file(filename, encoding=encoding) as f:
-            return f.read()
+        return read_all_fd(await self._open_fd(filename), encoding)
 
     async def open_file(self, filename: Union[str, LabelPath], *, encoding: Optional[str] = None):
+        return open_fd(await self._open_fd(filename), encoding)
+
+    async def _open_fd(self, filename: Union[str, LabelPath]) -> int:
         if isinstance(filename, str):
             filename = LabelPath(filename)
         if not isinstance(filename, LabelPath):
@@ -131,7 +137,7 @@ class ConcreteDepmap:
         )
         if result["type"] == "none":
             raise FileNotFoundError(f"depmap did not have file with name {filename!r}")
-        return open(result["fileno"], "r", encoding=encoding, buffering=128 * 1024)
+        return result["fileno"]
 
     async def iterdir(self, filename: Union[str, LabelPath]) -> List[LabelPath]:
         if isinstance(filename, str):
@@ -149,13 +155,55 @@ class ConcreteDepmap:
         return result["filenames"]
 
 
+class _Reference(NamedTuple):
+    target: Label
+
+
+class _Directory(NamedTuple):
+    pass
+
+
+_DIRECTORY = _Directory()
+
+
+class _File(NamedTuple):
+    content: Union[str, bytes]
+    executable: bool
+
+
+class _Symlink(NamedTuple):
+    target: str
+
+
+class _Filter(NamedTuple):
+    base: Label
+    patterns: List[str]
+
+
+_EntryPayload = Union[_Reference, _Directory, _File, _Symlink, _Filter]
+
+# Builds the tagged shape the runtime expects for each kind of entry
+_MATERIALIZERS = {
+    _Reference: lambda payload: dict(reference=payload.target),
+    _Directory: lambda payload: dict(directory={}),
+    _File: lambda payload: dict(file=dict(content=payload.content, executable=payload.executable)),
+    _Symlink: lambda payload: dict(symlink=dict(target=payload.target)),
+    _Filter: lambda payload: dict(filter=dict(base=payload.base, prefix=LabelPath(""), patterns=payload.patterns)),
+}
+
+
 def _translate_glob(glob: str) -> str:
     if isinstance(glob, re.Pattern):
         return glob.pattern
-    if m := re.fullmatch(r"\*([^\*]+)", glob):
-        return f"{re.escape(m.group(1))}$"
-    elif m := re.fullmatch(r"([^\*]+)\*", glob):
-        return f"^{re.escape(m.group(1))}"
-    else:
-        # FIXME: support more kinds of patterns
-        raise RuntimeError(f"TODO: glob {glob!r}")
+    return _translate_glob_str(glob)
+
+
+@functools.lru_cache(maxsize=4096)
+def _translate_glob_str(glob: str) -> str:
+    if len(glob) > 1:
+        if glob[0] == "*" and "*" not in glob[1:]:
+            return f"{re.escape(glob[1:])}$"
+        elif glob[-1] == "*" and "*" not in glob[:-1]:
+            return f"^{re.escape(glob[:-1])}"
+    # FIXME: support more kinds of patterns
+    raise RuntimeError(f"TODO: glob {glob!r}")
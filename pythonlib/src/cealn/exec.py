@@ -16,15 +16,15 @@ class Executable(Provider):
     library_search_paths = Field(List[str], default=[])
 
     def add_dependency_executable(self, rule, *executables, context_id=None) -> Executable:
-        search_paths = [*self.search_paths]
-        library_search_paths = [*self.library_search_paths]
+        search_paths = list(self.search_paths)
+        library_search_paths = list(self.library_search_paths)
         new_context = rule.new_depmap(id=context_id)
         if self.context:
             new_context.merge(self.context)
         for executable in executables:
             new_context.merge(executable.context)
-            search_paths += executable.search_paths
-            library_search_paths += executable.library_search_paths
+            search_paths.extend(executable.search_paths)
+            library_search_paths.extend(executable.library_search_paths)
         new_context = new_context.build()
 
         return Executable(
@@ -1,6 +1,6 @@
-from fnmatch import fnmatch
+from fnmatch import translate
 import re
-from typing import List, Union
+from typing import List, Optional, Union
 
 
 class GlobSet:
@@ -9,14 +9,19 @@ class GlobSet:
     def __init__(self, *args):
         self.patterns = list(args)
 
+        # Combine all the glob patterns into a single regex so matching is one call into the regex engine
+        glob_patterns = [pattern for pattern in self.patterns if isinstance(pattern, str)]
+        self._combined_glob: Optional[re.Pattern] = None
+        if glob_patterns:
+            self._combined_glob = re.compile("|".join(f"(?:{translate(pattern)})" for pattern in glob_patterns))
+        self._regex_patterns = [pattern for pattern in self.patterns if isinstance(pattern, re.Pattern)]
+
     def match(self, item):
-        for pattern in self.patterns:
-            if isinstance(pattern, str):
-                if fnmatch(item, pattern):
-                    return True
-            elif isinstance(pattern, re.Pattern):
-                if pattern.match(item):
-                    return True
+        if self._combined_glob is not None and self._combined_glob.match(item):
+            return True
+        for pattern in self._regex_patterns:
+            if pattern.match(item):
+                return True
         return False
 
     def to_json(self):
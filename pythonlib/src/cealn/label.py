@@ -1,42 +1,78 @@
 from __future__ import annotations
-from pathlib import Path, PurePosixPath
+from pathlib import Path
 from typing import Optional, Union
-import re
 import site
-import os
+from weakref import WeakValueDictionary
 
 
 class Label:
+    __slots__ = (
+        "_repr",
+        "_hash",
+        "_is_workspace_relative",
+        "_is_workspace_absolute",
+        "_is_package_relative",
+        "_workspace_name",
+        "_source_file_path",
+        "_python_module_name",
+        "__weakref__",
+    )
+
     _repr: str
 
     def __init__(self, repr: str):
         if not isinstance(repr, str):
-            raise TypeError("labels must be strings")
+            if isinstance(repr, Label):
+                repr = repr._repr
+            else:
+                raise TypeError("labels must be strings")
         # FIXME: check format
         self._repr = repr
+        self._hash = hash(repr)
+        # Labels are immutable, so parse out the structural parts once rather than on every access
+        self._is_workspace_relative = repr.startswith("//")
+        self._is_workspace_absolute = repr.startswith("@")
+        self._is_package_relative = not self._is_workspace_relative and not self._is_workspace_absolute
+        self._workspace_name = None
+        if self._is_workspace_absolute:
+            # Equivalent to `^@([^/]+)//`
+            separator_index = repr.find("/")
+            if separator_index > 1 and repr.startswith("//", separator_index):
+                self._workspace_name = repr[1:separator_index]
+        # Computed on first use
+        self._source_file_path = None
+        self._python_module_name = None
+
+    @classmethod
+    def _intern(cls, repr: str) -> Label:
+        """
+        Returns a shared instance for labels that are likely to be constructed from the same string many times
+        """
+        label = _LABEL_INTERN.get(repr)
+        if label is None:
+            label = cls(repr)
+            _LABEL_INTERN[repr] = label
+        return label
 
     @property
     def is_package_relative(self) -> bool:
-        return not self.is_workspace_relative and not self.is_workspace_absolute
+        return self._is_package_relative
 
     @property
     def is_workspace_relative(self) -> bool:
-        return self._repr.startswith("//")
+        return self._is_workspace_relative
 
     @property
     def is_workspace_absolute(self) -> bool:
-        return self._repr.startswith("@")
+        return self._is_workspace_absolute
 
     @property
     def workspace_name(self) -> Optional[str]:
-        match = _ABSOLUTE_WORKSPACE_REGEX.match(self._repr)
-        if match is None:
-            return None
-        return match.group(1)
+        return self._workspace_name
 
     @property
     def file_name(self) -> str:
-        return re.split(r":|/", self._repr)[-1]
+        return self._repr[max(self._repr.rfind(":"), self._repr.rfind("/")) + 1 :]
 
     def join(self, rhs: Union[str, Label, LabelPath]) -> Label:
         if isinstance(rhs, LabelPath):
@@ -73,30 +109,34 @@ class Label:
     @property
     def parent(self) -> Optional[Label]:
         # FIXME: handle more cases, particularly around colons
-        last_segment = re.split(r"\:|/", self._repr)[-1]
-        return Label(self._repr[: -(len(last_segment) + 1)])
+        separator_index = max(self._repr.rfind(":"), self._repr.rfind("/"))
+        return Label(self._repr[: max(separator_index, 0)])
 
     @property
     def package(self) -> Optional[Label]:
         # FIXME: handle more cases, particularly around colons
-        last_segment = re.split(r"\:", self._repr, maxsplit=1)[-1]
-        return Label(self._repr[: -(len(last_segment) + 1)])
+        colon_index = self._repr.find(":")
+        return Label(self._repr[: max(colon_index, 0)])
 
     def to_source_file_path(self) -> Path:
         """
         Produces a readable path assuming this label refers to a source file
         """
-        match = _ABSOLUTE_WORKSPACE_REGEX.match(self._repr)
-        if match is None:
+        if self._source_file_path is None:
+            self._source_file_path = self._compute_source_file_path()
+        return self._source_file_path
+
+    def _compute_source_file_path(self) -> Path:
+        workspace_name = self._workspace_name
+        if workspace_name is None:
             raise ValueError("label must be workspace absolute to be converted to a path")
 
-        workspace_name = match.group(1)
-        relative_path = self._repr[len(match.group(0)) :].replace(":", "/").lstrip("/")
+        relative_path = self._repr[len(workspace_name) + 3 :].replace(":", "/").lstrip("/")
 
         if workspace_name == "com.cealn.builtin":
             return Path(site.getsitepackages()[0]) / "cealn" / relative_path
 
-        return Path("/workspaces") / match.group(1) / relative_path
+        return Path("/workspaces") / workspace_name / relative_path
 
     def relative_to(self, ancestor: Label) -> Label:
         if isinstance(ancestor, str):
@@ -105,13 +145,17 @@ class Label:
         return Label(str(self.to_source_file_path().relative_to(ancestor.to_source_file_path())))
 
     def to_python_module_name(self) -> Path:
-        match = _ABSOLUTE_WORKSPACE_REGEX.match(self._repr)
-        if match is None:
+        if self._python_module_name is None:
+            self._python_module_name = self._compute_python_module_name()
+        return self._python_module_name
+
+    def _compute_python_module_name(self) -> str:
+        workspace_name = self._workspace_name
+        if workspace_name is None:
             raise ValueError("label must be workspace absolute to be converted to a path")
 
-        workspace_name = match.group(1)
         workspace_segment = workspace_name.replace(".", "_")
-        relative_path = self._repr[len(match.group(0)) :].replace(":", ".").replace("/", ".").lstrip(".")
+        relative_path = self._repr[len(workspace_name) + 3 :].replace(":", ".").replace("/", ".").lstrip(".")
         if relative_path.endswith(".py"):
             relative_path = relative_path[:-3]
 
@@ -130,12 +174,15 @@ class Label:
         return isinstance(obj, Label) and self._repr == obj._repr
 
     def __hash__(self):
-        return self._repr.__hash__()
+        return self._hash
 
     def __truediv__(self, obj: Union[str, Label]) -> Label:
         return self.join(obj)
 
 
+_LABEL_INTERN: "WeakValueDictionary[str, Label]" = WeakValueDictionary()
+
+
 class LabelPath:
     _repr: str
 
@@ -149,45 +196,48 @@ class LabelPath:
 
     @property
     def name(self) -> str:
-        # TODO: do this ourselves, super lazy
-        return PurePosixPath(self._repr).name
+        segments = _path_segments(self._repr)
+        return segments[-1] if segments else ""
 
     @property
     def parent(self) -> LabelPath:
-        # TODO: do this ourselves, super lazy
-        parent_str = str(PurePosixPath(self._repr).parent)
-        if parent_str == ".":
-            return LabelPath("")
-        else:
-            return LabelPath(parent_str)
+        return LabelPath(_join_segments(self._repr.startswith("/"), _path_segments(self._repr)[:-1]))
 
     def join(self, rhs: Union[str, LabelPath]) -> LabelPath:
         if isinstance(rhs, str):
             rhs = LabelPath(rhs)
         if not isinstance(rhs, LabelPath):
             raise TypeError("expected string or label path")
-        # TODO: do this ourselves, super lazy
-        return LabelPath(str(PurePosixPath(self._repr) / PurePosixPath(rhs._repr)))
+        if rhs._repr.startswith("/"):
+            return LabelPath(_join_segments(True, _path_segments(rhs._repr)))
+        return LabelPath(
+            _join_segments(self._repr.startswith("/"), _path_segments(self._repr) + _path_segments(rhs._repr))
+        )
 
     def relative_to(self, base: Union[str, LabelPath]) -> LabelPath:
         if isinstance(base, str):
             base = LabelPath(base)
         if not isinstance(base, LabelPath):
             raise TypeError("expected string or label path")
-        # TODO: do this ourselves, super lazy
-        return LabelPath(str(PurePosixPath(self._repr).relative_to(PurePosixPath(base._repr))))
+        segments = _path_segments(self._repr)
+        base_segments = _path_segments(base._repr)
+        if self._repr.startswith("/") != base._repr.startswith("/") or segments[: len(base_segments)] != base_segments:
+            raise ValueError(f"{self._repr!r} is not in the subpath of {base._repr!r}")
+        return LabelPath(_join_segments(False, segments[len(base_segments) :]))
 
     def normalize(self) -> LabelPath:
-        # TODO: do this ourselves, super lazy
-        normalized = PurePosixPath(os.path.normpath(self._repr))
-        return LabelPath(str(normalized))
+        normalized = _normalize(self._repr, require_descending=False)
+        if normalized == self._repr:
+            return self
+        return LabelPath(normalized)
 
     def normalize_require_descending(self) -> LabelPath:
-        # TODO: do this ourselves, super lazy
-        normalized = PurePosixPath(os.path.normpath(self._repr))
-        if ".." in normalized.parts:
+        normalized = _normalize(self._repr, require_descending=True)
+        if normalized is None:
             raise ValueError(f"provided LabelPath {self} escapes the root")
-        return LabelPath(str(normalized))
+        if normalized == self._repr:
+            return self
+        return LabelPath(normalized)
 
     def __str__(self):
         return self._repr
@@ -205,4 +255,43 @@ class LabelPath:
         return self.join(obj)
 
 
-_ABSOLUTE_WORKSPACE_REGEX = re.compile(r"^@([^/]+)//")
+def _path_segments(path: str) -> list:
+    # Same components `PurePosixPath` would produce, minus any root
+    return [segment for segment in path.split("/") if segment and segment != "."]
+
+
+def _join_segments(is_absolute: bool, segments: list) -> str:
+    if is_absolute:
+        return "/" + "/".join(segments)
+    return "/".join(segments)
+
+
+def _normalize(path: str, *, require_descending: bool) -> Optional[str]:
+    """
+    Collapses `.` and `..` components like `os.path.normpath`, returning `None` if `require_descending` is set and the
+    path escapes its root
+    """
+    is_absolute = path.startswith("/")
+    # Fast path: most paths handed to us are already normal, which a few substring scans can confirm
+    body = path[1:] if is_absolute else path
+    if not body:
+        # Like `os.path.normpath`, the empty relative path is `.`
+        return path if is_absolute else "."
+    wrapped = f"/{body}/"
+    if "//" not in wrapped and "/./" not in wrapped and "/../" not in wrapped:
+        return path
+    stack = []
+    for segment in path.split("/"):
+        if not segment or segment == ".":
+            continue
+        if segment == "..":
+            if stack and stack[-1] != "..":
+                stack.pop()
+                continue
+            if is_absolute:
+                # `..` at the root is the root
+                continue
+            if require_descending:
+                return None
+        stack.append(segment)
+    return _join_segments(is_absolute, stack) or "."
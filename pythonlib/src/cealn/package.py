@@ -16,7 +16,8 @@ def _add_rule_invocation_to_package(invocation):
     global _CONFIGURED_INFO
     if not _IS_PACKAGE:
         return
-    _CONFIGURED_INFO["package"]["targets"].append(invocation.to_json())
+    # Serialized along with the rest of the package info by `_get_configured_info`
+    _CONFIGURED_INFO["package"]["targets"].append(invocation)
 
 
 def _get_package_optional():
@@ -4,6 +4,7 @@ from typing import Generic, Optional, TypeVar
 
 from cealn.label import Label
 from cealn._json import _reference_label
+from cealn._reflect import _load_qualname
 
 _JSON_PROVIDER_SENTINEL = "$cealn_provider"
 
@@ -11,6 +12,8 @@ T = TypeVar("T")
 
 
 class Field(Generic[T]):
+    __slots__ = ("name", "has_default", "default", "ty")
+
     name: str
     has_default: bool
     default: Optional[T]
@@ -29,23 +32,26 @@ class Field(Generic[T]):
         if kwargs:
             raise TypeError(f"unexpected arguments {', '.join(kwargs.keys())}")
 
-    def __get__(self, obj, objtype=None):
-        return obj._data[self.name]
-
     # FIXME: validation based on type
 
 
 class ProviderMeta(type):
-    def __init__(cls, name, bases, dct):
-        super().__init__(name, bases, dct)
-
+    def __new__(mcls, name, bases, dct):
         # Gather fields and provide names
-        cls.fields = {}
-        for k, v in dct.items():
+        fields = {}
+        for k, v in list(dct.items()):
             if not isinstance(v, Field):
                 continue
             v.name = k
-            cls.fields[k] = v
+            fields[k] = dct.pop(k)
+
+        # Field values live in slots of the same name, so providers carry no instance dict and reads are plain
+        # attribute lookups
+        dct.setdefault("__slots__", tuple(fields))
+
+        cls = super().__new__(mcls, name, bases, dct)
+        cls.fields = fields
+        return cls
 
     @property
     def label(cls) -> str:
@@ -55,15 +61,26 @@ class ProviderMeta(type):
 class Provider(metaclass=ProviderMeta):
     def __init__(self, **kwargs):
         fields = self.__class__.fields
-        self._data = kwargs
 
-        for k in self._data:
+        for k in kwargs:
             if k not in fields:
                 raise TypeError(f"provider {self.__class__.__name__} has no field {k!r}")
+        for k, v in kwargs.items():
+            setattr(self, k, v)
         for k, field in fields.items():
-            if k not in self._data:
+            if k not in kwargs:
                 if field.has_default:
-                    self._data[k] = field.default
+                    setattr(self, k, field.default)
+
+    @property
+    def _data(self):
+        data = {}
+        for k in self.__class__.fields:
+            try:
+                data[k] = getattr(self, k)
+            except AttributeError:
+                pass
+        return data
 
     def to_json(self):
         return {
@@ -76,32 +93,10 @@ class Provider(metaclass=ProviderMeta):
 
     @classmethod
     def from_json(cls, data):
-        import importlib.util
-        import sys
-
         contents = data[_JSON_PROVIDER_SENTINEL]
-
-        # Load containing module
-        import_filename = contents["source_label"].to_source_file_path()
-        module_name = contents["source_label"].to_python_module_name()
-        if module_name in sys.modules:
-            module = sys.modules[module_name]
-        else:
-            spec = importlib.util.spec_from_file_location(module_name, import_filename)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-
-        qualname = contents["qualname"]
-        if "." in qualname:
-            # FIXME
-            raise RuntimeError("not implemented")
-        clazz = getattr(module, qualname)
+        clazz = _load_qualname(contents["source_label"], contents["qualname"])
         return clazz(**contents["data"])
 
     def __repr__(self) -> str:
-        s = f"{self.__class__.__qualname__}(\n"
-        for k, v in self._data.items():
-            s += f"  {k}={repr(v)},\n"
-        s += ")"
-        return s
+        fields = "".join(f"  {k}={v!r},\n" for k, v in self._data.items())
+        return f"{self.__class__.__qualname__}(\n{fields})"
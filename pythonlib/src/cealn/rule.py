@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+from collections import deque
+import functools
+import importlib
 from inspect import Traceback
+from itertools import repeat
 import inspect
 from pathlib import Path
 import shlex
 from types import coroutine
 from typing import Any, Awaitable, Counter, Dict, Optional, Type, TypeVar, Union, List
 import os
-from cealn.config import _JSON_OPTION_SENTINEL, Option
+from cealn.config import Option
 from cealn.platform import Os
 
 from cealn.provider import Provider
@@ -15,9 +19,10 @@ from cealn.depmap import DepmapBuilder
 
 from .label import Label, LabelPath
 from ._reflect import get_caller_location
+from ._fd import open_fd, read_all_fd
 from .attribute import Attribute
 from .action import Action, BuildDepmap, Download, DockerDownload, Extract, Run, GitClone, Transition
-from ._json import _reference_object
+from ._json import _reference_object, decode_json, encode_json
 from .exec import Executable, LinuxExecutePlatform, MacOSExecutePlatform
 
 
@@ -31,8 +36,9 @@ class RuleMeta(type):
         for k, v in dct.items():
             if not isinstance(v, Attribute):
                 continue
-            v.name = k
             cls.attributes[k] = v
+        # Fixed snapshot for analysis, which walks every attribute of every rule instance
+        cls._attribute_items = tuple(cls.attributes.items())
 
     def __call__(cls, **kwds) -> RuleInvocation:
         from cealn.package import _add_rule_invocation_to_package, _get_package_optional
@@ -86,15 +92,17 @@ class Rule(metaclass=RuleMeta):
         self.build_config = {}
         self.host_build_config = {}
         for [k, v] in build_config["options"]:
-            self.build_config[Option.from_json({_JSON_OPTION_SENTINEL: k})] = Option.from_json(
-                {_JSON_OPTION_SENTINEL: v}
-            )
+            self.build_config[Option._from_raw(k)] = Option._from_raw(v)
         for [k, v] in build_config["host_options"]:
-            self.host_build_config[Option.from_json({_JSON_OPTION_SENTINEL: k})] = Option.from_json(
-                {_JSON_OPTION_SENTINEL: v}
-            )
+            self.host_build_config[Option._from_raw(k)] = Option._from_raw(v)
         self.actions = []
         self.synthetic_targets = []
+        # Build configs don't change over the course of analysis, so their serialized forms are computed on demand once
+        self._referenced_options = None
+        self._referenced_host_options = None
+        self._cached_execute_platform = None
+        # Provider sets for a given target and config are fixed for the duration of analysis
+        self._loaded_providers = {}
 
     def analyze(self):
         raise NotImplementedError('rules must implement an "analyze" method')
@@ -103,29 +111,29 @@ class Rule(metaclass=RuleMeta):
         """
         Execute the steps necessary to build the referenced file and return its contents
         """
-        with await self.open_file(label, encoding=encoding) as f:
-            return f.read()
+        return read_all_fd(await self._open_file_fd(label), encoding)
 
     async def open_file(self, label: Label, *, encoding=None) -> Union[bytes, str]:
-        if isinstance(label, str):
-            label = Label(label)
+        return open_fd(await self._open_file_fd(label), encoding)
+
+    async def _open_file_fd(self, label: Label) -> int:
+        label = _as_label(label)
         if not isinstance(label, Label):
             raise TypeError(f"invalid file reference {label!r} provided")
 
         # Ensure label is absolute
         label = self.label.package / label
 
-        response = await AsyncRequestAwaiter(dict(type="label_open", label=label))
+        response = await AsyncRequestAwaiter({"type": "label_open", "label": label})
         if response["type"] == "file_handle":
-            return open(response["fileno"], "r", encoding=encoding, buffering=128 * 1024)
+            return response["fileno"]
         if response["type"] == "none":
             raise FileNotFoundError(f"no file with label {label}")
         else:
             raise RuntimeError("internal error: invalid response to async request")
 
     async def resolve_provider(self, provider_type: Type[Provider], target: Label, *, host=False) -> Provider:
-        if isinstance(target, str):
-            target = Label(target)
+        target = _as_label(target)
 
         providers = await self.load_providers(target, host=host)
         matching_providers = list(provider for provider in providers if isinstance(provider, provider_type))
@@ -137,25 +145,14 @@ class Rule(metaclass=RuleMeta):
             return matching_providers[0]
 
     async def load_providers(self, target: Label, *, host=False) -> List[Provider]:
-        if isinstance(target, str):
-            target = Label(target)
+        target = _as_label(target)
 
-        if host:
-            source_build_config = {
-                "options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-                "host_options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-            }
-        else:
-            source_build_config = {
-                "options": list((_reference_object(k), _reference_object(v)) for k, v in self.build_config.items()),
-                "host_options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-            }
+        cache_key = (target, host)
+        providers = self._loaded_providers.get(cache_key)
+        if providers is not None:
+            return list(providers)
+
+        source_build_config = self._get_source_build_config(host)
 
         response = await AsyncRequestAwaiter(
             dict(
@@ -166,13 +163,35 @@ class Rule(metaclass=RuleMeta):
         )
 
         if response["type"] == "providers":
-            return response["providers"]
+            providers = response["providers"]
+            self._loaded_providers[cache_key] = providers
+            return list(providers)
         else:
             raise RuntimeError("internal error: invalid response to async request")
 
+    def _get_source_build_config(self, host: bool):
+        host_options = self._get_referenced_options(host=True)
+        return {
+            "options": host_options if host else self._get_referenced_options(host=False),
+            "host_options": host_options,
+        }
+
+    def _get_referenced_options(self, *, host: bool):
+        if host:
+            if self._referenced_host_options is None:
+                self._referenced_host_options = tuple(
+                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
+                )
+            return self._referenced_host_options
+        else:
+            if self._referenced_options is None:
+                self._referenced_options = tuple(
+                    (_reference_object(k), _reference_object(v)) for k, v in self.build_config.items()
+                )
+            return self._referenced_options
+
     async def resolve_executable(self, target: Label, name: str, *, host=True) -> Executable:
-        if isinstance(target, str):
-            target = Label(target)
+        target = _as_label(target)
 
         providers = await self.load_providers(target, host=host)
 
@@ -182,22 +201,7 @@ class Rule(metaclass=RuleMeta):
         raise RuntimeError("no matching executable")
 
     async def resolve_global_provider(self, provider: Type[Provider], host=False) -> Provider:
-        if host:
-            source_build_config = {
-                "options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-                "host_options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-            }
-        else:
-            source_build_config = {
-                "options": list((_reference_object(k), _reference_object(v)) for k, v in self.build_config.items()),
-                "host_options": list(
-                    (_reference_object(k), _reference_object(v)) for k, v in self.host_build_config.items()
-                ),
-            }
+        source_build_config = self._get_source_build_config(host)
 
         response = await AsyncRequestAwaiter(
             dict(type="load_global_provider", provider=_reference_object(provider), build_config=source_build_config)
@@ -211,24 +215,28 @@ class Rule(metaclass=RuleMeta):
             raise RuntimeError("internal error: invalid response to async request")
 
     async def file_exists(self, label: Label) -> bool:
-        response = await AsyncRequestAwaiter(dict(type="file_exists", label=label))
+        label = _as_label(label)
+        response = await AsyncRequestAwaiter({"type": "file_exists", "label": label})
 
         return response["value"]
 
     async def is_file(self, label: Label) -> bool:
-        response = await AsyncRequestAwaiter(dict(type="is_file", label=label))
+        label = _as_label(label)
+        response = await AsyncRequestAwaiter({"type": "is_file", "label": label})
 
         return response["value"]
 
     async def target_exists(self, label: Label) -> bool:
-        response = await AsyncRequestAwaiter(dict(type="target_exists", label=label))
+        label = _as_label(label)
+        response = await AsyncRequestAwaiter({"type": "target_exists", "label": label})
 
         return response["value"]
 
     async def substitute_for_execution(self, value: str) -> str:
         # FIXME: handle other OS
-        platform = await self.resolve_global_provider(LinuxExecutePlatform, host=True)
-        return platform.substitute(value)
+        if self._cached_execute_platform is None:
+            self._cached_execute_platform = await self.resolve_global_provider(LinuxExecutePlatform, host=True)
+        return self._cached_execute_platform.substitute(value)
 
     # Action constructors
     def run(
@@ -237,8 +245,8 @@ class Rule(metaclass=RuleMeta):
         *args: List[str],
         input: Optional[Label] = None,
         cwd: Optional[str] = None,
-        append_env: Dict[str, str] = {},
-        append_env_files: List[Label] = [],
+        append_env: Optional[Dict[str, str]] = None,
+        append_env_files: Optional[List[Label]] = None,
         hide_stdout: bool = False,
         hide_stderr: bool = False,
         platform=None,
@@ -252,9 +260,13 @@ class Rule(metaclass=RuleMeta):
         if mnemonic is None:
             mnemonic = Path(executable.executable_path).name
         if progress_message is None:
-            progress_message = " ".join(map(shlex.quote, map(str, args)))
+            progress_message = _LazyJoin(args)
         if isinstance(cwd, LabelPath):
             cwd = str(cwd)
+        if append_env is None:
+            append_env = {}
+        if append_env_files is None:
+            append_env_files = []
         action = Run(
             executable=executable,
             args=list(args),
@@ -273,9 +285,11 @@ class Rule(metaclass=RuleMeta):
         self._add_action(action)
         return action
 
-    def script(self, input: Optional[Label] = None, append_env: Dict[str, str] = {}) -> Script:
+    def script(self, input: Optional[Label] = None, append_env: Optional[Dict[str, str]] = None) -> Script:
         from .script import Script
 
+        if append_env is None:
+            append_env = {}
         return Script(rule=self, input=input, append_env=append_env)
 
     def download(
@@ -366,7 +380,7 @@ class Rule(metaclass=RuleMeta):
         return DepmapBuilder(self, id=id)
 
     def _build_depmap(self, builder: DepmapBuilder):
-        action = BuildDepmap(entries=builder._entries, id=builder.id, mnemonic="BuildDepmap", progress_message="")
+        action = BuildDepmap(entries=builder._entries(), id=builder.id, mnemonic="BuildDepmap", progress_message="")
         self._add_action(action)
         return action
 
@@ -399,26 +413,31 @@ class Rule(metaclass=RuleMeta):
 
     async def gather(self, coroutines):
         if isinstance(coroutines, dict):
-            results = await AsyncGroupAwaiter(list(coroutines.values()))
-            output = {}
-            for k, result in zip(coroutines.keys(), results):
-                output[k] = result
-            return output
+            if len(coroutines) <= 1:
+                # Nothing to interleave, so skip the group machinery
+                return {k: await v for k, v in coroutines.items()}
+            # `AsyncGroupAwaiter` takes its own copy of the values, so there's no need to make one here
+            results = await AsyncGroupAwaiter(coroutines.values())
+            return dict(zip(coroutines.keys(), results))
         else:
+            if not isinstance(coroutines, list):
+                coroutines = list(coroutines)
+            if len(coroutines) <= 1:
+                return [await coroutine for coroutine in coroutines]
             return await AsyncGroupAwaiter(coroutines)
 
     async def _run_analyze(self):
-        import inspect
-
-        attribute_tasks = {}
-        for k, attribute in self.__class__.attributes.items():
-            attribute_tasks[k] = self._resolve_attribute(k, attribute)
-        self.attributes_resolved = await self.gather(attribute_tasks)
+        attribute_items = self.__class__._attribute_items
+        attributes_resolved = await self.gather(
+            [self._resolve_attribute(k, attribute) for k, attribute in attribute_items]
+        )
+        for (_, attribute), value in zip(attribute_items, attributes_resolved):
+            setattr(self, attribute._attr, value)
 
         result = self.analyze()
 
         # Allow `analyze` to be synchronous or asynchronous
-        if inspect.iscoroutine(result):
+        if _iscoroutine(result):
             result = await result
 
         if result is not None:
@@ -435,69 +454,126 @@ class Rule(metaclass=RuleMeta):
 
         return {
             "actions": self.actions,
-            "synthetic_targets": list(map(lambda x: x.to_json(), self.synthetic_targets)),
+            "synthetic_targets": self.synthetic_targets,
             "providers": result,
         }
 
     async def _resolve_attribute(self, k, attribute):
-        if k in self.attributes_input:
-            return await attribute.resolve_from_source(self.attributes_input[k], rule=self)
-        else:
+        source = self.attributes_input.get(k, Attribute.NotSet)
+        if source is Attribute.NotSet:
             # This should already have been checked when the rule was invoked
             assert attribute.is_optional
-            return await attribute.resolve_from_source(Attribute.NotSet, rule=self)
+        return await attribute.resolve_from_source(source, rule=self)
+
+
+def _as_label(value):
+    """
+    Converts strings to labels, passing everything else through for the caller to validate
+    """
+    if value.__class__ is Label:
+        return value
+    if isinstance(value, str):
+        return Label(value)
+    return value
+
+
+class _LazyJoin:
+    """
+    Default progress message for `Rule.run`, quoting the arguments only once the message is actually serialized
+    """
+
+    __slots__ = ("args", "_value")
+
+    def __init__(self, args):
+        self.args = args
+        self._value = None
+
+    def __str__(self):
+        if self._value is None:
+            self._value = " ".join(map(shlex.quote, map(str, self.args)))
+        return self._value
 
 
 class AsyncRequestAwaiter:
+    __slots__ = ("request",)
+
     def __init__(self, request):
         self.request = request
 
     def __await__(self):
-        response = yield [self.request]
+        # A lone request is yielded bare; `AsyncGroupAwaiter` and `_poll_rule` accept either a request or a list
+        response = yield self.request
         return response
 
 
 class AsyncGroupAwaiter:
+    __slots__ = ("coroutines",)
+
     def __init__(self, coroutines):
-        self.coroutines = coroutines
+        self.coroutines = list(coroutines)
 
     def __await__(self):
-        active_coroutines = [*self.coroutines]
-        outputs = [None] * len(self.coroutines)
-        response_mappings = []
+        if len(self.coroutines) == 1 and self.coroutines[0] is not None:
+            return [(yield from self.coroutines[0].__await__())]
 
-        # Get initial requests
-        requests = []
-        for i, coroutine in enumerate(active_coroutines):
-            if coroutine is None:
-                continue
-            try:
-                coroutine_requests = coroutine.send(None)
-            except StopIteration as ex:
-                outputs[i] = ex.value
-                active_coroutines[i] = None
-            else:
-                requests += coroutine_requests
-                response_mappings += [i] * len(coroutine_requests)
+        active_coroutines = [*self.coroutines]
+        requests, response_mappings, outputs, remaining = _drain_initial(active_coroutines)
 
         # Continue to solicit requests and handle responses
-        while any(active_coroutines):
+        while remaining:
             response = yield requests
             requests = []
-            response_dest_index = response_mappings.pop(0)
+            response_dest_index = response_mappings.popleft()
             try:
                 coroutine_requests = active_coroutines[response_dest_index].send(response)
             except StopIteration as ex:
                 outputs[response_dest_index] = ex.value
                 active_coroutines[response_dest_index] = None
+                remaining -= 1
             else:
-                requests += coroutine_requests
-                response_mappings += [response_dest_index] * len(coroutine_requests)
+                if type(coroutine_requests) is list:
+                    requests.extend(coroutine_requests)
+                    response_mappings.extend(repeat(response_dest_index, len(coroutine_requests)))
+                else:
+                    requests.append(coroutine_requests)
+                    response_mappings.append(response_dest_index)
 
         return outputs
 
 
+def _drain_initial(active_coroutines):
+    """
+    Starts every coroutine in the group, collecting all of their first requests so they are submitted as one batch
+
+    Coroutines that finish without making a request are replaced with `None` in `active_coroutines`.
+    """
+    outputs = [None] * len(active_coroutines)
+    # Indices of the coroutines that issued each outstanding request, in the order the responses will arrive
+    response_mappings = deque()
+    remaining = 0
+    requests = []
+    for i, coroutine in enumerate(active_coroutines):
+        if coroutine is None:
+            continue
+        try:
+            coroutine_requests = coroutine.send(None)
+        except StopIteration as ex:
+            outputs[i] = ex.value
+            active_coroutines[i] = None
+        else:
+            remaining += 1
+            if type(coroutine_requests) is list:
+                requests.extend(coroutine_requests)
+                response_mappings.extend(repeat(i, len(coroutine_requests)))
+            else:
+                requests.append(coroutine_requests)
+                response_mappings.append(i)
+    return requests, response_mappings, outputs, remaining
+
+
 class RuleInvocation:
+    __slots__ = ("rule", "name", "output_mounts", "invocation_data", "instantiation_location")
+
     rule: RuleMeta
     name: str
     invocation_data: Dict[Any, Any]
@@ -531,26 +607,31 @@ _CURRENT_RULE_INSTANCE = None
 _CURRENT_RULE_TASK = None
 
 
+@functools.lru_cache(maxsize=4096)
+def _module_path_for(rule_file: str) -> str:
+    # FIXME: with probably breaks on a bunch of stuff
+    if not rule_file.startswith(_WORKSPACES_PREFIX):
+        raise RuntimeError("rule defined outside of workspace")
+    workspace_name, _, workspace_path = rule_file[len(_WORKSPACES_PREFIX) :].partition("/")
+    workspace_path = os.path.splitext(workspace_path)[0]
+    return "workspaces." + workspace_name.replace(".", "_") + "." + workspace_path.replace("/", ".")
+
+
+@functools.lru_cache(maxsize=None)
+def _import_rule_module(rule_file: str):
+    return importlib.import_module(_module_path_for(rule_file))
+
+
+_WORKSPACES_PREFIX = "/workspaces/"
+
+_iscoroutine = inspect.iscoroutine
+
+
 def _prepare_rule(
     rule_file: str,
     class_name: str,
 ):
-    import importlib
-    from ._json import decode_json
-
-    # FIXME: with probably breaks on a bunch of stuff
-    rule_file = Path(rule_file)
-    try:
-        workspaces_dir_relative = rule_file.relative_to("/workspaces")
-    except ValueError:
-        raise RuntimeError("rule defined outside of workspace")
-    workspace_name = workspaces_dir_relative.parts[0]
-    workspace_path = workspaces_dir_relative.relative_to(workspace_name)
-    module_path = (
-        "workspaces." + workspace_name.replace(".", "_") + "." + str(workspace_path.with_suffix("")).replace("/", ".")
-    )
-
-    module = importlib.import_module(module_path)
+    module = _import_rule_module(rule_file)
     _rule_class = getattr(module, class_name)
 
 
@@ -565,22 +646,7 @@ def _start_rule(
     global _CURRENT_RULE_INSTANCE
     global _CURRENT_RULE_TASK
 
-    import importlib
-    from ._json import decode_json
-
-    # FIXME: with probably breaks on a bunch of stuff
-    rule_file = Path(rule_file)
-    try:
-        workspaces_dir_relative = rule_file.relative_to("/workspaces")
-    except ValueError:
-        raise RuntimeError("rule defined outside of workspace")
-    workspace_name = workspaces_dir_relative.parts[0]
-    workspace_path = workspaces_dir_relative.relative_to(workspace_name)
-    module_path = (
-        "workspaces." + workspace_name.replace(".", "_") + "." + str(workspace_path.with_suffix("")).replace("/", ".")
-    )
-
-    module = importlib.import_module(module_path)
+    module = _import_rule_module(rule_file)
     rule_class = getattr(module, class_name)
 
     attributes_input = decode_json(attributes_json)
@@ -596,8 +662,6 @@ def _start_rule(
 def _poll_rule(event):
     global _CURRENT_RULE_TASK
 
-    from ._json import encode_json, decode_json
-
     event = decode_json(event)
     if event["type"] == "first_poll":
         # First send into a coroutine must always be `None` so we can get our first request
@@ -608,4 +672,6 @@ def _poll_rule(event):
     except StopIteration as ex:
         return encode_json({"done": ex.value})
     else:
+        if type(requests) is not list:
+            requests = [requests]
         return encode_json({"requests": requests})
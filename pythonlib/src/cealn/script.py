@@ -5,29 +5,39 @@ from cealn.rule import Rule
 
 
 class Script:
+    __slots__ = ("rule", "input", "append_env", "_current_input", "_pending_files")
+
     def __init__(self, *, rule: Rule, input: Optional[Label], append_env: Dict[str, str]):
         self.rule = rule
         self.input = input
         self.append_env = append_env
 
         self._current_input = self.input
+        # Output of the last step, merged into `_current_input` only once something needs the combined depmap
+        self._pending_files = None
 
     def run(
         self,
         executable: Executable,
         *args: List[str],
-        append_env: Dict[str, str] = {},
+        append_env: Optional[Dict[str, str]] = None,
         hide_stdout: bool = False,
         hide_stderr: bool = False,
         id: Optional[str] = None,
         mnemonic: Optional[str] = None,
         progress_message: Optional[str] = None,
     ):
+        # Only merge environments when both sides contribute something
+        if not append_env:
+            append_env = self.append_env
+        elif self.append_env:
+            append_env = {**self.append_env, **append_env}
+
         sub_action = self.rule.run(
             executable,
             *args,
-            input=self._current_input,
-            append_env={**self.append_env, **append_env},
+            input=self._materialize(),
+            append_env=append_env,
             hide_stdout=hide_stdout,
             hide_stderr=hide_stderr,
             id=id,
@@ -35,14 +45,20 @@ class Script:
             progress_message=progress_message,
         )
 
-        new_input = self.rule.new_depmap()
-        if self._current_input:
-            new_input.merge(self._current_input)
-        new_input.merge(sub_action.files)
-        self._current_input = new_input.build()
+        self._pending_files = sub_action.files
 
         return sub_action
 
     @property
     def files(self) -> Label:
+        return self._materialize()
+
+    def _materialize(self) -> Optional[Label]:
+        if self._pending_files is not None:
+            new_input = self.rule.new_depmap()
+            if self._current_input:
+                new_input.merge(self._current_input)
+            new_input.merge(self._pending_files)
+            self._current_input = new_input.build()
+            self._pending_files = None
         return self._current_input
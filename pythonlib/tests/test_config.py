@@ -0,0 +1,38 @@
+from cealn.config import CompilationMode, Debug, Fastbuild, Optimized, select
+from cealn.platform import Linux, Os, Windows
+
+
+class _FakeRule:
+    def __init__(self, build_config):
+        self.build_config = build_config
+
+
+def _run(coroutine):
+    try:
+        coroutine.send(None)
+    except StopIteration as ex:
+        return ex.value
+    raise AssertionError("selection resolution should not suspend")
+
+
+def test_selection_resolve():
+    selection = select({Debug: "debug", Optimized: "opt"}, "default")
+
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Debug}))) == "debug"
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Optimized}))) == "opt"
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Fastbuild}))) == "default"
+
+
+def test_selection_resolve_mixed_options_prefers_mapping_order():
+    selection = select({Optimized: "opt", Linux: "linux", Debug: "debug"}, "default")
+
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Debug, Os: Linux}))) == "linux"
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Optimized, Os: Linux}))) == "opt"
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Debug, Os: Windows}))) == "debug"
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Fastbuild, Os: Windows}))) == "default"
+
+
+def test_selection_resolve_skips_options_after_first_match():
+    selection = select({Debug: "debug", Linux: "linux"}, "default")
+
+    assert _run(selection.resolve(_FakeRule({CompilationMode: Debug}))) == "debug"
@@ -0,0 +1,29 @@
+from cealn.depmap import DepmapBuilder
+from cealn.label import Label, LabelPath
+
+
+def test_depmap_builder_entries():
+    builder = DepmapBuilder(None, None)
+    builder["a"] = "//x:y"
+    builder["d"] = DepmapBuilder.directory()
+    builder["f"] = DepmapBuilder.file("hi", executable=True)
+    builder["g"] = DepmapBuilder.glob("//src", "*.py")
+    builder.merge(Label("//z"))
+
+    assert builder._entries() == [
+        (LabelPath("a"), dict(reference=Label("//x:y"))),
+        (LabelPath("d"), dict(directory={})),
+        (LabelPath("f"), dict(file=dict(content="hi", executable=True))),
+        (LabelPath("g"), dict(filter=dict(base=Label("//src"), prefix=LabelPath(""), patterns=[r"\.py$"]))),
+        (LabelPath(""), dict(reference=Label("//z"))),
+    ]
+
+
+def test_depmap_builder_update():
+    builder = DepmapBuilder(None, None)
+    builder.update([("a", "//x:y"), (LabelPath("b/c"), DepmapBuilder.directory())])
+
+    assert builder._entries() == [
+        (LabelPath("a"), dict(reference=Label("//x:y"))),
+        (LabelPath("b/c"), dict(directory={})),
+    ]
@@ -0,0 +1,17 @@
+import re
+
+from cealn.glob import GlobSet
+
+
+def test_globset_match():
+    globset = GlobSet("*.o", "*.obj", re.compile(r"lib.*\.a"))
+
+    assert globset.match("foo.o")
+    assert globset.match("dir/foo.obj")
+    assert globset.match("libfoo.a")
+    assert not globset.match("foo.c")
+    assert not globset.match("foo.objx")
+
+
+def test_empty_globset_matches_nothing():
+    assert not GlobSet().match("anything")
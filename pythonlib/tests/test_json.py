@@ -0,0 +1,23 @@
+from cealn.label import Label, LabelPath
+from cealn.glob import GlobSet
+from cealn.action import TemplateArgument
+from cealn._json import encode_json, decode_json
+
+
+def test_nested_json_encode():
+    value = {
+        "b": (LabelPath("some/path"), 1),
+        "a": TemplateArgument("--flag=%[source]", Label("//my_package:my_file")),
+    }
+
+    assert (
+        encode_json(value)
+        == '{"a":{"$cealn_argument_source_templated":"--flag=%[source]","source":{"$cealn_label":"//my_package:my_file"}},"b":[{"$cealn_label_path":"some/path"},1]}'
+    )
+
+
+def test_globset_json_roundtrip():
+    globset = decode_json(encode_json(GlobSet("*.py", "*.pyi")))
+
+    assert isinstance(globset, GlobSet)
+    assert globset.patterns == ["*.py", "*.pyi"]
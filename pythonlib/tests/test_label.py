@@ -1,8 +1,10 @@
-from cealn.label import Label
+from cealn.label import Label, LabelPath, _normalize
 from cealn._json import encode_json, decode_json
 
 import json
 
+import pytest
+
 
 def test_label_to_str():
     label = Label("@my_workspace//my_package:my_file")
@@ -20,3 +22,53 @@ def test_label_json_decode():
     label = Label("@my_workspace//my_package:my_file")
 
     assert decode_json('{"$cealn_label":"@my_workspace//my_package:my_file"}') == label
+
+
+def test_label_structure():
+    label = Label("@my_workspace//my_package/sub:my_file.py")
+
+    assert label.is_workspace_absolute
+    assert not label.is_workspace_relative
+    assert label.workspace_name == "my_workspace"
+    assert label.file_name == "my_file.py"
+    assert label.parent == Label("@my_workspace//my_package/sub")
+    assert label.package == Label("@my_workspace//my_package/sub")
+    assert label.to_python_module_name() == "workspaces.my_workspace.my_package.sub.my_file"
+
+
+def test_label_without_workspace():
+    label = Label("//my_package:my_file")
+
+    assert label.is_workspace_relative
+    assert label.workspace_name is None
+    assert Label("my_file").is_package_relative
+
+
+def test_label_path_normalize():
+    assert LabelPath("a/./b/../c/").normalize() == LabelPath("a/c")
+    assert LabelPath("../a").normalize() == LabelPath("../a")
+    assert LabelPath("a/..").normalize() == LabelPath(".")
+    assert LabelPath("").normalize() == LabelPath(".")
+    assert LabelPath(".").normalize() == LabelPath(".")
+    assert LabelPath("").normalize_require_descending() == LabelPath(".")
+    assert LabelPath(".").normalize_require_descending() == LabelPath(".")
+
+    with pytest.raises(ValueError):
+        LabelPath("a/../../b").normalize_require_descending()
+
+
+def test_normalize_empty_path_is_dot():
+    assert _normalize("", require_descending=False) == "."
+    assert _normalize(".", require_descending=False) == "."
+    assert _normalize("./a/..", require_descending=True) == "."
+    assert _normalize("/", require_descending=False) == "/"
+
+
+def test_label_path_components():
+    path = LabelPath("a/b/c.txt")
+
+    assert path.name == "c.txt"
+    assert path.parent == LabelPath("a/b")
+    assert LabelPath("a").parent == LabelPath("")
+    assert path.relative_to("a") == LabelPath("b/c.txt")
+    assert LabelPath("a") / "b/./c" == LabelPath("a/b/c")
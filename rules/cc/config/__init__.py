@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import functools
+
 from cealn.platform import (
     Arch,
     Aarch64,
@@ -22,23 +24,27 @@ from cealn.config import Option
 
 def llvm_target_triple(build_config):
     arch = build_config[Arch]
-    try:
-        arch = _ARCH_MAPPINGS[arch]
-    except KeyError as ex:
-        raise ValueError("unknown architecture") from ex
-
     os = build_config[Os]
-    try:
-        os = _OS_MAPPINGS[os]
-    except KeyError as ex:
-        raise ValueError("unknown os") from ex
-
-    if os not in _NO_VENDOR_OS:
-        vendor = build_config[Vendor]
-        try:
-            vendor = _VENDOR_MAPPINGS[vendor]
-        except KeyError as ex:
-            raise ValueError("unknown os") from ex
+    # Only look up the vendor when the triple will include it, since it need not be configured otherwise
+    vendor = None if os in _NO_VENDOR_OS else build_config[Vendor]
+    return _llvm_target_triple(arch, os, vendor)
+
+
+@functools.lru_cache(maxsize=None)
+def _llvm_target_triple(arch, os, vendor) -> str:
+    arch = _ARCH_MAPPINGS.get(arch)
+    if arch is None:
+        raise ValueError("unknown architecture")
+
+    needs_vendor = os not in _NO_VENDOR_OS
+    os = _OS_MAPPINGS.get(os)
+    if os is None:
+        raise ValueError("unknown os")
+
+    if needs_vendor:
+        vendor = _VENDOR_MAPPINGS.get(vendor)
+        if vendor is None:
+            raise ValueError("unknown vendor")
 
         return f"{arch}-{vendor}-{os}"
     else:
@@ -66,7 +72,7 @@ _OS_MAPPINGS = {
     UnknownOs: "unknown",
 }
 
-_NO_VENDOR_OS = set(["wasi"])
+_NO_VENDOR_OS = frozenset([Wasi])
 
 
 class CrtLinkage(Option):
@@ -1,4 +1,6 @@
-from typing import Dict, List
+import functools
+import itertools
+from typing import Dict, List, Tuple
 from cealn.config import CompilationMode, Debug, Fastbuild, Optimized
 
 from cealn.exec import Executable
@@ -6,7 +8,7 @@ from cealn.label import Label
 from cealn.platform import Arch, Cuda, Linux, Os, Wasm32, Windows, Wasi
 from cealn.provider import Provider, Field
 
-from ..config import CrtLinkage, CrtDynamic, CrtStatic
+from ..config import CrtLinkage, CrtDynamic, CrtStatic, llvm_target_triple
 
 
 class CcToolchain(Provider):
@@ -43,9 +45,10 @@ class LLVMToolchain(CcToolchain):
             return self.clang_pp
 
     def linker(self, build_config) -> Executable:
-        if build_config[Os] == Windows:
+        os = build_config[Os]
+        if os == Windows:
             return self.lld_link
-        elif build_config[Arch] == Wasm32 and build_config[Os] != Wasi:
+        elif build_config[Arch] == Wasm32 and os != Wasi:
             return self.wasm_ld
         else:
             return self.clang
@@ -57,212 +60,239 @@ class LLVMToolchain(CcToolchain):
             return self.llvm_ar
 
     def dylib_name(self, build_config, name: str) -> str:
-        if build_config[Os] == Linux:
-            return f"lib{name}.so"
-        elif build_config[Os] == Cuda:
-            return f"{name}.cubin"
-        elif build_config[Arch] == Wasm32:
-            return f"{name}.wasm"
-        else:
-            raise RuntimeError("unsupported target")
+        template = _DYLIB_NAME_BY_OS.get(build_config[Os])
+        if template is None:
+            template = _DYLIB_NAME_BY_ARCH.get(build_config[Arch])
+            if template is None:
+                raise RuntimeError("unsupported target")
+        return template.format(name=name)
 
     def exe_name(self, build_config, name: str) -> str:
-        if build_config[Arch] == Wasm32:
-            return f"{name}.wasm"
-        elif build_config[Os] == Windows:
-            return f"{name}.exe"
-        else:
-            return name
+        template = _EXE_NAME_BY_ARCH.get(build_config[Arch])
+        if template is None:
+            template = _EXE_NAME_BY_OS.get(build_config[Os])
+            if template is None:
+                return name
+        return template.format(name=name)
 
     def cflags(self, build_config) -> List[str]:
-        flags = list(self._clang_flags(build_config))
-        return flags
+        return list(self._clang_flags(build_config, self.cc(build_config).name))
 
     def cxxflags(self, build_config) -> List[str]:
-        flags = list(self._clang_flags(build_config))
-        cc = self.cc(build_config)
-        if cc.name == "clang-cl":
-            flags += ["/std:c++20"]
-        elif cc.name == "clang":
-            flags += [
-                "-stdlib=libc++",
-                "-std=c++20",
-            ]
-        return flags
-
-    def _clang_flags(self, build_config) -> List[str]:
-        from ..config import llvm_target_triple
-
-        target = llvm_target_triple(build_config)
-        cc = self.cc(build_config)
-        if cc.name == "clang":
-            flags = [
-                "-target",
-                target,
-                "-Wno-builtin-macro-redefined",
-                "-D__TIME__=",
-                "-D__DATE__=",
-                "-D__TIMESTAMP_=",
-                "-ffunction-sections",
-                "-fdata-sections",
-                "-fdebug-default-version=4",
-                "-fcolor-diagnostics",
-            ]
-            if build_config[CompilationMode] == Optimized:
-                if build_config[Arch] == Wasm32:
-                    flags += ["-Oz"]
-                else:
-                    flags += ["-O3"]
-                flags += ["-flto=thin", "-DNDEBUG"]
-            else:
-                flags += ["-O0", "-DDEBUG"]
-            if build_config[CompilationMode] == Debug:
-                flags += ["-g3"]
-            else:
-                flags += ["-gline-tables-only"]
-        elif cc.name == "clang-cl":
-            flags = [
-                "/nologo",
-                "-target",
-                target,
-                "-Wno-builtin-macro-redefined",
-                "/D__TIME__=",
-                "/D__DATE__=",
-                "/D__TIMESTAMP__=",
-                "/Brepro",
-                "/Zc:inline",
-                "/utf-8",
-                "-fcolor-diagnostics",
-            ]
-            if build_config[CompilationMode] == Optimized:
-                flags += ["/O2", "/Ob2", "/Oy-", "-flto=thin", "/DNDEBUG"]
-            else:
-                flags += ["/DDEBUG"]
-            if build_config[CompilationMode] == Debug:
-                flags += ["/Z7"]
-            else:
-                flags += ["/Z7", "-gline-tables-only"]
-            crt_linkage = CrtLinkage.get_or_default(build_config)
-            if crt_linkage == CrtDynamic:
-                flags += ["/MD"]
-            elif crt_linkage == CrtStatic:
-                flags += ["/MT"]
-        if build_config[Os] == Linux:
-            flags += ["--sysroot", "%[srcdir]/.sysroot"]
-        if build_config[Os] == Wasi:
-            flags += [
-                "--sysroot",
-                "%[srcdir]/.sysroot",
-            ]
-        return flags
+        cc_name = self.cc(build_config).name
+        return list(itertools.chain(self._clang_flags(build_config, cc_name), _CXX_STD_FLAGS.get(cc_name, ())))
+
+    def _clang_flags(self, build_config, cc_name: str) -> Tuple[str, ...]:
+        return _compute_clang_flags(
+            cc_name,
+            build_config[Os],
+            build_config[Arch],
+            build_config[CompilationMode],
+            CrtLinkage.get_or_default(build_config),
+            llvm_target_triple(build_config),
+        )
 
     def linker_output_flags(self, build_config, output_filename: str) -> List[str]:
-        linker = self.linker(build_config)
-        if linker.name == "clang" or linker.name == "wasm-ld":
-            return ["-o", output_filename]
-        elif linker.name == "lld-link":
-            return [f"/OUT:{output_filename}"]
-        else:
-            raise RuntimeError("unsupported linker")
+        try:
+            output_flags = _LINKER_OUTPUT_FLAGS[self.linker(build_config).name]
+        except KeyError as ex:
+            raise RuntimeError("unsupported linker") from ex
+        return output_flags(output_filename)
 
     def linker_flags(self, build_config) -> List[str]:
-        from ..config import llvm_target_triple
-
-        flags = []
-
-        linker = self.linker(build_config)
-        if linker.name == "clang":
-            target = llvm_target_triple(build_config)
-            flags += ["-Wl,--gc-sections", f"--target={target}"]
-            if build_config[Arch] != Wasm32:
-                flags += [
-                    "-fuse-ld=lld",
-                ]
-        elif linker.name == "lld-link":
-            flags += [
-                "/Brepro",
-                "/pdbaltpath:%_PDB%",
-            ]
-        if build_config[Os] == Cuda:
-            flags += [
-                "--cuda-gpu-arch=sm_89",
-            ]
-        if linker.name == "clang" or linker.name == "wasm-ld":
-            if build_config[CompilationMode] == Optimized:
-                flags += [
-                    "-O3",
-                ]
-            elif build_config[CompilationMode] == Debug:
-                flags += [
-                    "-O0",
-                ]
-            elif build_config[CompilationMode] == Fastbuild:
-                flags += [
-                    "-O0",
-                ]
-        elif linker.name == "lld-link":
-            if build_config[CompilationMode] == Optimized:
-                flags += [
-                    "/opt:lldlto=3",
-                ]
-            else:
-                flags += [
-                    "/opt:lldlto=0",
-                ]
-            if build_config[CompilationMode] == Debug:
-                flags += ["/opt:noref", "/opt:noicf"]
-            else:
-                flags += ["/opt:ref", "/opt:icf"]
-            if build_config[CompilationMode] == Fastbuild:
-                flags += ["/DEBUG"]
-            else:
-                flags += ["/DEBUG:FULL"]
-        if build_config[Os] == Linux:
-            flags += [
-                "--sysroot",
-                "%[srcdir]/.sysroot",
-                # FIXME: detect when these are needed
-                "-lpthread",
-                "-ldl",
-                "-lm",
-            ]
-        if build_config[Os] == Wasi:
-            flags += [
-                "--sysroot",
-                "%[srcdir]/.sysroot",
-            ]
-        return flags
+        linker_name = self.linker(build_config).name
+        # The target triple is only passed to the clang driver
+        target = llvm_target_triple(build_config) if linker_name == "clang" else None
+        return list(
+            _compute_linker_flags(
+                linker_name, build_config[Os], build_config.get(Arch), build_config.get(CompilationMode), target
+            )
+        )
 
     def add_extra_inputs(self, build_config, depmap):
-        if build_config[Os] == Windows:
+        os = build_config[Os]
+        if os == Windows:
             # FIXME: find this
             depmap[".windows"] = Label("@io.hardscience//toolchains/windows:downloaded:sdk")
-        elif build_config[Os] == Linux:
+        elif os == Linux:
             # FIXME: find this
             depmap[".sysroot"] = Label("@io.hardscience//toolchains/cc:sysroot:sysroot")
-        elif build_config[Os] == Wasi:
+        elif os == Wasi:
             # FIXME: find this
             depmap[".sysroot"] = Label("@io.hardscience//toolchains/cc:wasi_sysroot:sysroot")
 
     def cc_env(self, build_config) -> Dict[str, str]:
-        envs = {}
         if build_config[Os] == Windows:
-            include_subpaths = [
-                "sdk/include/shared",
-                "sdk/include/um",
-                "sdk/include/ucrt",
-                "crt/include",
-            ]
-            envs["INCLUDE"] = ";".join(f"%[srcdir]/.windows/{subpath}" for subpath in include_subpaths)
-        return envs
+            return {"INCLUDE": _WINDOWS_INCLUDE}
+        return {}
 
     def linker_env(self, build_config) -> Dict[str, str]:
-        envs = {}
         if build_config[Os] == Windows:
-            lib_subpaths = [
-                "sdk/lib/um/x86_64",
-                "sdk/lib/ucrt/x86_64",
-                "crt/lib/x86_64",
-            ]
-            envs["LIB"] = ";".join(f"%[srcdir]/.windows/{subpath}" for subpath in lib_subpaths)
-        return envs
+            return {"LIB": _WINDOWS_LIB}
+        return {}
+
+
+_DYLIB_NAME_BY_OS = {
+    Linux: "lib{name}.so",
+    Cuda: "{name}.cubin",
+}
+
+_DYLIB_NAME_BY_ARCH = {
+    Wasm32: "{name}.wasm",
+}
+
+_EXE_NAME_BY_ARCH = {
+    Wasm32: "{name}.wasm",
+}
+
+_EXE_NAME_BY_OS = {
+    Windows: "{name}.exe",
+}
+
+_LINKER_OUTPUT_FLAGS = {
+    "clang": lambda output_filename: ["-o", output_filename],
+    "wasm-ld": lambda output_filename: ["-o", output_filename],
+    "lld-link": lambda output_filename: [f"/OUT:{output_filename}"],
+}
+
+_WINDOWS_INCLUDE = ";".join(
+    f"%[srcdir]/.windows/{subpath}"
+    for subpath in [
+        "sdk/include/shared",
+        "sdk/include/um",
+        "sdk/include/ucrt",
+        "crt/include",
+    ]
+)
+
+_WINDOWS_LIB = ";".join(
+    f"%[srcdir]/.windows/{subpath}"
+    for subpath in [
+        "sdk/lib/um/x86_64",
+        "sdk/lib/ucrt/x86_64",
+        "crt/lib/x86_64",
+    ]
+)
+
+
+# Flags only depend on a handful of config values, and are requested several times per rule
+@functools.lru_cache(maxsize=None)
+def _compute_clang_flags(cc_name, os, arch, compilation_mode, crt_linkage, target) -> Tuple[str, ...]:
+    if cc_name == "clang":
+        if compilation_mode == Optimized:
+            opt_flags = ("-Oz" if arch == Wasm32 else "-O3", "-flto=thin", "-DNDEBUG")
+        else:
+            opt_flags = ("-O0", "-DDEBUG")
+        parts = (
+            ("-target", target),
+            _CLANG_BASE_FLAGS,
+            opt_flags,
+            ("-g3",) if compilation_mode == Debug else ("-gline-tables-only",),
+        )
+    elif cc_name == "clang-cl":
+        parts = (
+            ("/nologo", "-target", target),
+            _CLANG_CL_BASE_FLAGS,
+            _CLANG_CL_OPTIMIZED_FLAGS if compilation_mode == Optimized else ("/DDEBUG",),
+            ("/Z7",) if compilation_mode == Debug else ("/Z7", "-gline-tables-only"),
+            _CLANG_CL_CRT_FLAGS.get(crt_linkage, ()),
+        )
+    else:
+        raise RuntimeError("unsupported compiler")
+    return tuple(itertools.chain(*parts, _SYSROOT_FLAGS.get(os, ())))
+
+
+_CLANG_BASE_FLAGS = (
+    "-Wno-builtin-macro-redefined",
+    "-D__TIME__=",
+    "-D__DATE__=",
+    "-D__TIMESTAMP_=",
+    "-ffunction-sections",
+    "-fdata-sections",
+    "-fdebug-default-version=4",
+    "-fcolor-diagnostics",
+)
+
+_CLANG_CL_BASE_FLAGS = (
+    "-Wno-builtin-macro-redefined",
+    "/D__TIME__=",
+    "/D__DATE__=",
+    "/D__TIMESTAMP__=",
+    "/Brepro",
+    "/Zc:inline",
+    "/utf-8",
+    "-fcolor-diagnostics",
+)
+
+_CXX_STD_FLAGS = {
+    "clang": ("-stdlib=libc++", "-std=c++20"),
+    "clang-cl": ("/std:c++20",),
+}
+
+_CLANG_CL_OPTIMIZED_FLAGS = ("/O2", "/Ob2", "/Oy-", "-flto=thin", "/DNDEBUG")
+
+_CLANG_CL_CRT_FLAGS = {
+    CrtDynamic: ("/MD",),
+    CrtStatic: ("/MT",),
+}
+
+_SYSROOT_FLAGS = {
+    Linux: ("--sysroot", "%[srcdir]/.sysroot"),
+    Wasi: ("--sysroot", "%[srcdir]/.sysroot"),
+}
+
+
+def _compute_linker_flags(linker_name, os, arch, compilation_mode, target) -> Tuple[str, ...]:
+    if linker_name == "clang":
+        head = ("-Wl,--gc-sections", f"--target={target}")
+        if arch != Wasm32:
+            head += ("-fuse-ld=lld",)
+    elif linker_name == "lld-link":
+        head = ("/Brepro", "/pdbaltpath:%_PDB%")
+    else:
+        head = ()
+    tail = _LINKER_FLAG_TABLE.get((linker_name, compilation_mode, os))
+    if tail is None:
+        tail = _linker_mode_os_flags(linker_name, compilation_mode, os)
+    return head + tail
+
+
+def _linker_mode_os_flags(linker_name, compilation_mode, os) -> Tuple[str, ...]:
+    parts = []
+    if os == Cuda:
+        parts.append(("--cuda-gpu-arch=sm_89",))
+    if linker_name == "clang" or linker_name == "wasm-ld":
+        parts.append(_LLD_OPT_FLAGS.get(compilation_mode, ()))
+    elif linker_name == "lld-link":
+        parts.append(("/opt:lldlto=3",) if compilation_mode == Optimized else ("/opt:lldlto=0",))
+        parts.append(("/opt:noref", "/opt:noicf") if compilation_mode == Debug else ("/opt:ref", "/opt:icf"))
+        parts.append(("/DEBUG",) if compilation_mode == Fastbuild else ("/DEBUG:FULL",))
+    parts.append(_LINKER_SYSROOT_FLAGS.get(os, ()))
+    return tuple(itertools.chain.from_iterable(parts))
+
+
+_LLD_OPT_FLAGS = {
+    Optimized: ("-O3",),
+    Debug: ("-O0",),
+    Fastbuild: ("-O0",),
+}
+
+_LINKER_SYSROOT_FLAGS = {
+    Linux: (
+        "--sysroot",
+        "%[srcdir]/.sysroot",
+        # FIXME: detect when these are needed
+        "-lpthread",
+        "-ldl",
+        "-lm",
+    ),
+    Wasi: ("--sysroot", "%[srcdir]/.sysroot"),
+}
+
+# Everything after the driver-specific prefix depends only on these three values, so tabulate the known combinations
+_LINKER_FLAG_TABLE = {
+    (linker_name, compilation_mode, os): _linker_mode_os_flags(linker_name, compilation_mode, os)
+    for linker_name in ("clang", "lld-link", "wasm-ld")
+    for compilation_mode in (Optimized, Debug, Fastbuild)
+    for os in (Linux, Windows, Wasi, Cuda)
+}
@@ -15,11 +15,6 @@ class DownloadLLVMToolchain(Rule):
     version = Attribute[str]()
 
     async def analyze(self):
-        release_url = f"https://api.github.com/repos/llvm/llvm-project/releases/tags/llvmorg-{self.version}"
-        release_dl = await self.download(release_url, filename="response.json", user_agent="curl/7.87.0")
-        with await release_dl.files.open_file("response.json", encoding="utf-8") as release_file:
-            release = json.load(release_file)
-
         try:
             target_arch = _ARCH_MAP[self.build_config[Arch]]
         except KeyError as ex:
@@ -30,10 +25,19 @@ class DownloadLLVMToolchain(Rule):
             raise RuntimeError("unsupported os") from ex
         target = f"{target_arch}-{target_os}"
 
+        release_url = f"https://api.github.com/repos/llvm/llvm-project/releases/tags/llvmorg-{self.version}"
+        release_dl = await self.download(release_url, filename="response.json", user_agent="curl/7.87.0")
+        # Only the asset list is needed, so don't keep the rest of the release document alive
+        assets = json.loads(await release_dl.files.get_file_contents("response.json", encoding="utf-8"))["assets"]
+
         main_context = None
 
-        for asset in release["assets"]:
-            match = _MAIN_ARCHIVE_REGEX.fullmatch(asset["name"])
+        for asset in assets:
+            name = asset["name"]
+            # Most assets are signatures or unrelated archives, so skip them before running the regex
+            if not name.startswith("clang+llvm-") or not name.endswith(".tar.xz"):
+                continue
+            match = _MAIN_ARCHIVE_REGEX.match(name)
             if match:
                 match_target = match.group("target")
                 if match_target != target:
@@ -57,14 +61,10 @@ class DownloadLLVMToolchain(Rule):
         context = context.build()
 
         toolchain = LLVMToolchain(
-            clang=Executable(name="clang", context=context, executable_path="%[execdir]/bin/clang"),
-            clang_pp=Executable(name="clang++", context=context, executable_path="%[execdir]/bin/clang++"),
-            clang_cl=Executable(name="clang-cl", context=context, executable_path="%[execdir]/bin/clang-cl"),
-            lld=Executable(name="lld", context=context, executable_path="%[execdir]/bin/lld"),
-            lld_link=Executable(name="lld-link", context=context, executable_path="%[execdir]/bin/lld-link"),
-            llvm_ar=Executable(name="llvm-ar", context=context, executable_path="%[execdir]/bin/llvm-ar"),
-            llvm_lib=Executable(name="llvm-lib", context=context, executable_path="%[execdir]/bin/llvm-lib"),
-            wasm_ld=Executable(name="wasm-ld", context=context, executable_path="%[execdir]/bin/wasm-ld"),
+            **{
+                field: Executable(name=name, context=context, executable_path=f"%[execdir]/bin/{name}")
+                for field, name in _LLVM_EXECUTABLES
+            }
         )
 
         return [
@@ -76,6 +76,17 @@ class DownloadLLVMToolchain(Rule):
         ]
 
 
+_LLVM_EXECUTABLES = (
+    ("clang", "clang"),
+    ("clang_pp", "clang++"),
+    ("clang_cl", "clang-cl"),
+    ("lld", "lld"),
+    ("lld_link", "lld-link"),
+    ("llvm_ar", "llvm-ar"),
+    ("llvm_lib", "llvm-lib"),
+    ("wasm_ld", "wasm-ld"),
+)
+
 _MAIN_ARCHIVE_REGEX = re.compile(
     r"^(?P<stem>clang\+llvm-(?P<version>\d+\.\d+\.\d+)-(?P<target>.+?)(-ubuntu-(\d+\.\d+))?)\.tar\.xz$"
 )
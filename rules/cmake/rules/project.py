@@ -32,6 +32,10 @@ class CmakeProject(Rule):
     async def analyze(self):
         build_dir = "build"
 
+        # Both the configure and build inputs need the toolchain's extra inputs, so only resolve them once
+        extra_inputs = {}
+        self.cc_toolchain.add_extra_inputs(self.build_config, extra_inputs)
+
         configure_input = self.new_depmap()
         configure_input["CMakeLists.txt"] = self.cmake_lists
         configure_input[".fake_ninja"] = DepmapBuilder.file(_FAKE_NINJA_SCRIPT, executable=True)
@@ -41,7 +45,8 @@ class CmakeProject(Rule):
         configure_input[build_dir] = DepmapBuilder.directory()
         configure_input.merge(self.input_files)
         configure_input[f"{build_dir}/.cmake/api/v1/query/codemodel-v2"] = DepmapBuilder.file("")
-        self.cc_toolchain.add_extra_inputs(self.build_config, configure_input)
+        for k, v in extra_inputs.items():
+            configure_input[k] = v
         configure_input = configure_input.build()
 
         if self.build_config[CompilationMode] == Optimized:
@@ -50,12 +55,11 @@ class CmakeProject(Rule):
             build_type = "Debug"
 
         cmake = self.toolchain.cmake.add_dependency_executable(self, self.cc_toolchain.clang)
-        for tool_label in self.extra_build_tools:
-            tool_executables = [
-                provider
-                for provider in await self.load_providers(tool_label, host=True)
-                if isinstance(provider, Executable)
-            ]
+        tool_providers = await self.gather(
+            [self.load_providers(tool_label, host=True) for tool_label in self.extra_build_tools]
+        )
+        for loaded_providers in tool_providers:
+            tool_executables = [provider for provider in loaded_providers if isinstance(provider, Executable)]
             cmake = cmake.add_dependency_executable(self, *tool_executables)
 
         configure = self.run(
@@ -80,9 +84,15 @@ class CmakeProject(Rule):
 
         providers = []
         reply_dir = LabelPath(f"{build_dir}/.cmake/api/v1/reply")
-        for reply_filename in await configure_output.files.iterdir(reply_dir):
+
+        async def load_reply(reply_filename):
             with await configure_output.files.open_file(reply_dir / reply_filename, encoding="utf-8") as f:
-                reply = json.load(f)
+                return json.load(f)
+
+        replies = await self.gather(
+            [load_reply(reply_filename) for reply_filename in await configure_output.files.iterdir(reply_dir)]
+        )
+        for reply in replies:
             if "type" not in reply:
                 continue
             if reply["type"] == "EXECUTABLE":
@@ -100,7 +110,8 @@ class CmakeProject(Rule):
         ninja_input = self.new_depmap()
         ninja_input.merge(configure.files)
         ninja_input.merge(self.input_files)
-        self.cc_toolchain.add_extra_inputs(self.build_config, ninja_input)
+        for k, v in extra_inputs.items():
+            ninja_input[k] = v
         ninja_input = ninja_input.build()
 
         exec_context = self.new_depmap()
@@ -113,38 +124,44 @@ class CmakeProject(Rule):
         return [NinjaInput(input=ninja_input, exec_context=exec_context, build_root="build", append_env={}), *providers]
 
     async def generate_toolchain_file(self):
-        toolchain_file = ""
-
-        if self.build_config[Os] == Linux:
-            toolchain_file += "set(CMAKE_SYSTEM_NAME Linux)\n"
-        else:
+        if self.build_config[Os] != Linux:
             raise RuntimeError("unsupported platform")
-        toolchain_file += f"set(CMAKE_SYSTEM_PROCESSOR {_ARCH_MAP[self.build_config[Arch]]})\n"
-        if self.build_config[Os] == Linux:
-            toolchain_file += await self.substitute_for_execution("set(CMAKE_SYSROOT %[srcdir]/.sysroot)\n")
 
+        # The execute platform is cached after the first lookup, so the second substitution is free
+        sysroot = await self.substitute_for_execution("%[srcdir]/.sysroot")
         cxx_compiler = await self.substitute_for_execution(self.cc_toolchain.clang.executable_path)
-        toolchain_file += f"set(CMAKE_C_COMPILER {cxx_compiler})\n"
-        toolchain_file += f"set(CMAKE_CXX_COMPILER {cxx_compiler})\n"
-
-        toolchain_file += f"set(CMAKE_C_FLAGS_INIT {json.dumps(' '.join(shlex.quote(arg) for arg in self.cc_toolchain.cflags(self.build_config)))})\n"
-        toolchain_file += f"set(CMAKE_CXX_FLAGS_INIT {json.dumps(' '.join(shlex.quote(arg) for arg in self.cc_toolchain.cxxflags(self.build_config)))})\n"
 
-        linker_flags = self.cc_toolchain.linker_flags(self.build_config)
+        cflags = json.dumps(shlex.join(self.cc_toolchain.cflags(self.build_config)))
+        cxxflags = json.dumps(shlex.join(self.cc_toolchain.cxxflags(self.build_config)))
         # FIXME: hack
-        linker_flags += ["-lc++", "-lc++abi", "-lsupc++"]
-        linker_flags = json.dumps(" ".join(shlex.quote(arg) for arg in linker_flags))
-        toolchain_file += f"set(CMAKE_EXE_LINKER_FLAGS_INIT {linker_flags})\n"
-        toolchain_file += f"set(CMAKE_SHARED_LINKER_FLAGS_INIT {linker_flags})\n"
-        toolchain_file += f"set(CMAKE_MODULE_LINKER_FLAGS_INIT {linker_flags})\n"
-
-        toolchain_file += "set(CMAKE_FIND_ROOT_PATH_MODE_PROGRAM NEVER)\n"
-        toolchain_file += "set(CMAKE_FIND_ROOT_PATH_MODE_LIBRARY ONLY)\n"
-        toolchain_file += "set(CMAKE_FIND_ROOT_PATH_MODE_INCLUDE ONLY)\n"
-        toolchain_file += "set(CMAKE_FIND_ROOT_PATH_MODE_PACKAGE ONLY)\n"
-
-        return toolchain_file
-
+        linker_flags = [*self.cc_toolchain.linker_flags(self.build_config), "-lc++", "-lc++abi", "-lsupc++"]
+        linker_flags = json.dumps(shlex.join(linker_flags))
+
+        return _TOOLCHAIN_FILE_TEMPLATE % {
+            "processor": _ARCH_MAP[self.build_config[Arch]],
+            "sysroot": sysroot,
+            "compiler": cxx_compiler,
+            "cflags": cflags,
+            "cxxflags": cxxflags,
+            "linker_flags": linker_flags,
+        }
+
+
+_TOOLCHAIN_FILE_TEMPLATE = """set(CMAKE_SYSTEM_NAME Linux)
+set(CMAKE_SYSTEM_PROCESSOR %(processor)s)
+set(CMAKE_SYSROOT %(sysroot)s)
+set(CMAKE_C_COMPILER %(compiler)s)
+set(CMAKE_CXX_COMPILER %(compiler)s)
+set(CMAKE_C_FLAGS_INIT %(cflags)s)
+set(CMAKE_CXX_FLAGS_INIT %(cxxflags)s)
+set(CMAKE_EXE_LINKER_FLAGS_INIT %(linker_flags)s)
+set(CMAKE_SHARED_LINKER_FLAGS_INIT %(linker_flags)s)
+set(CMAKE_MODULE_LINKER_FLAGS_INIT %(linker_flags)s)
+set(CMAKE_FIND_ROOT_PATH_MODE_PROGRAM NEVER)
+set(CMAKE_FIND_ROOT_PATH_MODE_LIBRARY ONLY)
+set(CMAKE_FIND_ROOT_PATH_MODE_INCLUDE ONLY)
+set(CMAKE_FIND_ROOT_PATH_MODE_PACKAGE ONLY)
+"""
 
 _ARCH_MAP = {
     X86_64: "x86_64",
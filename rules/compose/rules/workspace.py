@@ -19,14 +19,19 @@ class ComposeWorkspace(Rule):
     global_labels = Attribute(default={})
 
     async def analyze(self):
-        self._support_exe = None
-
         self.resources = self.new_depmap("resources")
 
         self.images = {}
         self.volumes = []
 
-        await self.gather([self.handle_source(source_label) for source_label in self.sources])
+        # Every image needs the support executable, so resolve it once alongside the sources instead of on first use
+        self._support_exe, *source_providers = await self.gather(
+            [
+                self.resolve_executable("@com.cealn.compose//support:crate", "cealn-rules-compose-support"),
+                *(self.load_providers(source_label) for source_label in self.sources),
+            ]
+        )
+        await self.gather([self.handle_source(providers) for providers in source_providers])
 
         self.resources = self.resources.build()
 
@@ -55,30 +60,39 @@ class ComposeWorkspace(Rule):
         output.merge(manifest_run.files)
         output = output.build()
 
-    async def handle_source(self, source_label):
-        providers = await self.load_providers(source_label)
-        await self.gather(
-            [self.handle_docker_image(provider) for provider in providers if isinstance(provider, DockerImage)]
-        )
-        await self.gather(
-            [self.handle_service(provider) for provider in providers if isinstance(provider, K8Service)]
-            + [self.handle_volume(provider) for provider in providers if isinstance(provider, ComposeVolume)]
-        )
+    async def handle_source(self, providers):
+        images = []
+        services = []
+        volume_tasks = []
+        for provider in providers:
+            if isinstance(provider, DockerImage):
+                images.append(provider)
+            elif isinstance(provider, K8Service):
+                services.append(provider)
+            elif isinstance(provider, ComposeVolume):
+                volume_tasks.append(self.handle_volume(provider))
+        # Services reference `self.images`, so they wait on this source's images, but volumes don't need to
+        await self.gather([self.handle_images_then_services(images, services), *volume_tasks])
+
+    async def handle_images_then_services(self, images, services):
+        await self.gather([self.handle_docker_image(image) for image in images])
+        await self.gather([self.handle_service(service) for service in services])
 
     async def handle_docker_image(self, image):
         image_output_subpath = LabelPath("images") / image.tag
 
         image_resources = self.new_depmap()
 
+        entries = []
         layer_metadatas = []
         for layer_index, layer in enumerate(image.layers):
             layer_output_subpath = image_output_subpath / str(layer_index)
             if layer.files:
-                image_resources[layer_output_subpath] = layer.files
+                entries.append((layer_output_subpath, layer.files))
                 layer_metadatas.append({"loose": str(layer_output_subpath)})
             elif layer.blob:
                 blob_filename = f"{layer_output_subpath}.tar.gz"
-                image_resources[blob_filename] = layer.blob
+                entries.append((blob_filename, layer.blob))
                 layer_metadatas.append(
                     {
                         "blob": {
@@ -91,6 +105,7 @@ class ComposeWorkspace(Rule):
                 )
             else:
                 raise RuntimeError("unsupported layer type")
+        image_resources.update(entries)
 
         image_resources = image_resources.build()
 
@@ -137,8 +152,4 @@ class ComposeWorkspace(Rule):
         self.resources[LabelPath("volumes") / volume.namespace / volume.persistent_volume_claim] = volume.files
 
     async def support_exe(self):
-        if not self._support_exe:
-            self._support_exe = await self.resolve_executable(
-                "@com.cealn.compose//support:crate", "cealn-rules-compose-support"
-            )
         return self._support_exe
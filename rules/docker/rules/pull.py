@@ -18,18 +18,18 @@ class DockerPull(Rule):
         metadata_run = await self.run(
             support_exe,
             "metadata",
-            "--output",
-            "metadata.json",
             "--os",
             os,
             "--architecture",
             arch,
             self.image,
+            hide_stdout=True,
             id="metadata",
             mnemonic="DockerPullManifest",
             progress_message=f"{self.image}",
         )
-        with await metadata_run.files.open_file("metadata.json", encoding="utf-8") as f:
+        # Read the metadata straight from stdout rather than round-tripping it through the action's output files
+        with await metadata_run.open_stdout(encoding="utf-8") as f:
             metadata = json.load(f)
 
         layers = []
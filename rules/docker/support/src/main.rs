@@ -1,7 +1,7 @@
 use std::{
     fs::File,
     io::{BufWriter, Write},
-    path::PathBuf,
+    path::{Path, PathBuf},
 };
 
 use clap::{Parser, Subcommand};
@@ -24,8 +24,9 @@ enum SubCommand {
 
 #[derive(Parser, Debug)]
 pub struct MetadataOpts {
-    #[clap(long = "output", required = true)]
-    output_path: PathBuf,
+    /// Where to write the metadata JSON; written to stdout if omitted
+    #[clap(long = "output")]
+    output_path: Option<PathBuf>,
 
     #[clap(long, required = true)]
     os: String,
@@ -135,8 +136,20 @@ fn metadata(metadata_opts: MetadataOpts) {
         });
     }
 
-    let mut output = BufWriter::new(File::create(&metadata_opts.output_path).unwrap());
-    serde_json::to_writer(&mut output, &metadata).unwrap();
+    write_metadata(metadata_opts.output_path.as_deref(), &metadata);
+}
+
+fn write_metadata(output_path: Option<&Path>, metadata: &Metadata) {
+    // Without an output path the metadata document *is* stdout, so all diagnostics must go to stderr
+    let output: Box<dyn Write> = match output_path {
+        Some(output_path) => Box::new(File::create(output_path).unwrap()),
+        None => Box::new(std::io::stdout().lock()),
+    };
+    encode_metadata(BufWriter::new(output), metadata);
+}
+
+fn encode_metadata<W: Write>(mut output: W, metadata: &Metadata) {
+    serde_json::to_writer(&mut output, metadata).unwrap();
     output.flush().unwrap();
 }
 
@@ -408,3 +421,30 @@ impl ImageReference {
         self.digest.as_deref().or(self.tag.as_deref()).unwrap_or("latest")
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn metadata_encoding_is_a_single_json_document() {
+        let metadata = Metadata {
+            layers: vec![LayerMetadata {
+                digest: "sha256:abc".to_owned(),
+                diff_id: "sha256:def".to_owned(),
+                media_type: "application/vnd.oci.image.layer.v1.tar+gzip".to_owned(),
+            }],
+            run_config: None,
+        };
+
+        let mut buffer = Vec::new();
+        encode_metadata(&mut buffer, &metadata);
+
+        // The rule parses captured stdout as-is, so the encoding must round-trip with nothing else around it
+        let decoded: Metadata = serde_json::from_slice(&buffer).unwrap();
+        assert_eq!(decoded.layers.len(), 1);
+        assert_eq!(decoded.layers[0].digest, "sha256:abc");
+        assert_eq!(decoded.layers[0].diff_id, "sha256:def");
+        assert!(decoded.run_config.is_none());
+    }
+}
@@ -1,3 +1,4 @@
+from itertools import islice
 from pathlib import Path
 from typing import List
 
@@ -52,6 +53,15 @@ class MSBuild(Rule):
             progress_message=str(self.project_file),
         )
 
+        # Nothing here depends on the reference list, so declare it before waiting on `dotnet list reference`
+        sources = self.new_depmap("sources")
+        sources[root_subpath / self.project_file.file_name] = self.project_file
+        sources[root_subpath] = DepmapBuilder.glob(self.project_file.parent, *self.source_patterns)
+        sources = sources.build()
+
+        build_input = self.new_depmap("build-input")
+        build_input.merge(sources)
+
         list_references = await self.run(
             self.toolchain.runner,
             "list",
@@ -65,26 +75,14 @@ class MSBuild(Rule):
             progress_message=str(self.project_file),
         )
 
-        references = []
         with await list_references.open_stdout(encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                if i < 2:
-                    continue
-                references.append(LabelPath(line.strip().replace("\\", "/")))
-
-        sources = self.new_depmap("sources")
-        sources[root_subpath / self.project_file.file_name] = self.project_file
-        sources[root_subpath] = DepmapBuilder.glob(self.project_file.parent, *self.source_patterns)
-        sources = sources.build()
-
-        build_input = self.new_depmap("build-input")
-        build_input.merge(sources)
-
-        for reference_path in references:
-            reference_root_subpath = (root_subpath / reference_path).normalize().parent
-            reference_cealn_target = (self.source_root / reference_root_subpath).join_action("msbuild")
-            build_input.merge(reference_cealn_target.join_action("sources"))
-            build_input.merge(reference_cealn_target.join_action("build"))
+            # The first two lines are a header
+            for line in islice(f, 2, None):
+                reference_path = LabelPath(line.strip().replace("\\", "/"))
+                reference_root_subpath = (root_subpath / reference_path).normalize().parent
+                reference_cealn_target = (self.source_root / reference_root_subpath).join_action("msbuild")
+                build_input.merge(reference_cealn_target.join_action("sources"))
+                build_input.merge(reference_cealn_target.join_action("build"))
 
         build_input.merge(restore.files)
         build_input = build_input.build()
@@ -27,12 +27,15 @@ class GoModule(Rule):
         mod_input["go.sum"] = self.sum_file
         mod_input = mod_input.build()
 
+        # The module directive is almost always at the top of the file, so stop reading once it's found
         with await self.open_file(self.module_file, encoding="utf-8") as f:
-            module_file_contents = f.read()
-        module_match = _MODULE_REGEX.search(module_file_contents)
-        if module_match is None:
-            raise RuntimeError("missing module name")
-        module_name = module_match.group("module")
+            for line in f:
+                module_match = _MODULE_REGEX.match(line)
+                if module_match is not None:
+                    module_name = module_match.group("module")
+                    break
+            else:
+                raise RuntimeError("missing module name")
 
         envs = {
             "CGO_ENABLED": "0",
@@ -112,7 +115,7 @@ class GoModule(Rule):
         return providers
 
 
-_MODULE_REGEX = re.compile(r"^module\s+(?P<module>.+)$", re.MULTILINE)
+_MODULE_REGEX = re.compile(r"module\s+(?P<module>\S+)")
 
 _OS_MAP = {
     Linux: "linux",